@@ -1,29 +1,169 @@
 import streamlit as st
-from sqlalchemy import create_engine
 import pandas as pd
 
-from metrics import get_player_stats, player_overview, player_overview_apg, get_player_metric_figs, get_team_stats,get_team_metric_figs
-from explore import rename_columns, create_graph, RENAME_MAP, rename_columns2, create_graph2, RENAME_MAP2
+from career import DELTA_SUFFIX, ROLLING_SUFFIX, ROLLING_WINDOW, Z_SUFFIX, entity_id, trajectory
+from charts import SCATTER_MODES, grouped_bar_figure, radar_figure, trajectory_figure
+from db import query_count, reset_query_count
+from metrics import compare
+from entities import PLAYERS, TEAMS
+from planner import PagePlan
+from profiling import finish_rerun, percentiles, span, start_rerun
+from search import search_names
+from similar import SIMILARITY_COL, similar
+from store import get_store
+from explore import create_graph, column_catalog, column_labels, load_axes
 
 st.set_page_config(layout="wide", initial_sidebar_state="expanded")
 
-def prev_season(season: str) -> str:
-
-    start_year = int(season.split("-")[0])
-    prev_start = start_year - 1
-    prev_end = start_year
-    return f"{prev_start}-{str(prev_end)[-2:]}"
+reset_query_count()
+start_rerun()
+
+# Only the selected view runs on a rerun (st.tabs would execute every tab body).
+VIEWS = ["Overview", "Explore", "Career", "Compare"]
+STAT_CHOICES = {"Player stats": PLAYERS, "Team stats": TEAMS}
+SEASONS = ["2024-25", "2023-24", "2022-23", "2021-22", "2020-21"]
+MAX_COMPARE = 20
+
+
+@st.fragment
+def explore_panel(entity, name, season, season_type):
+    """
+    Scatter builder. A fragment, so changing an axis reruns just this panel.
+    """
+    labels = column_labels(entity.table)
+    numeric_cols = list(column_catalog(entity.table))
+    DISPLAY_TO_INTERNAL = {labels.get(c, c): c for c in numeric_cols}
+
+    display_cols = [""] + list(DISPLAY_TO_INTERNAL)
+
+    st.subheader("Make your own chart")
+    chart_type = st.radio("Chart type", ["Scatter"], horizontal=True)
+
+    if chart_type == "Scatter":
+        x_disp = st.selectbox("X-axis", display_cols)
+        y_disp = st.selectbox("Y-axis", display_cols)
+
+        scope = st.radio("Seasons", ["This season", "All seasons"], horizontal=True, key="explore_scope")
+        mode = st.radio("Draw as", SCATTER_MODES, horizontal=True, key="explore_mode")
+
+        x_axis = DISPLAY_TO_INTERNAL.get(x_disp, x_disp)
+        y_axis = DISPLAY_TO_INTERNAL.get(y_disp, y_disp)
+
+        axes_season = season if scope == "This season" else None
+        axes_df = load_axes(entity.table, x_axis, y_axis, axes_season, season_type) if x_axis and y_axis else None
+        create_graph(entity, x_axis, y_axis, chart_type, axes_df, name, mode)
+
+@st.fragment
+def career_panel(entity, name, season, season_type):
+    """
+    Every season of the selected player/team, followed by id so namesakes
+    stay apart.
+    """
+    history = trajectory(entity, entity_id(entity, name, season, season_type))
+    labels = dict(zip(entity.card_labels, entity.metrics))
+
+    st.subheader(f"{name} season by season")
+    label = st.selectbox("Metric", list(labels), key="career_metric")
+    metric = labels[label]
+
+    with span("figure", f"trajectory {entity.table}.{metric}"):
+        fig = trajectory_figure(history, metric, label, f"{label} by season")
+    st.plotly_chart(fig, use_container_width=True)
+
+    table = history[["season", "game_type", metric, metric + DELTA_SUFFIX, metric + ROLLING_SUFFIX, metric + Z_SUFFIX]]
+    st.dataframe(
+        table.rename(columns={
+            "season": "Season",
+            "game_type": "Type",
+            metric: label,
+            metric + DELTA_SUFFIX: "Change",
+            metric + ROLLING_SUFFIX: "Rolling avg",
+            metric + Z_SUFFIX: "League z-score",
+        }).round(2),
+        hide_index=True,
+        use_container_width=True
+    )
+    st.caption(f"Rolling averages cover the last {ROLLING_WINDOW} seasons of the same type; "
+               "z-scores compare against that season's league.")
+
+@st.fragment
+def similar_panel(entity, name, season, season_type):
+    """
+    Closest stat profiles. A fragment, so switching the scope reruns just
+    this panel.
+    """
+    st.subheader(f"{entity.plural.capitalize()} like {name}")
+    scope = st.radio("Compare with", ["This season", "All seasons"], horizontal=True, key="similar_scope")
+
+    with span("similar", f"{entity.table} {scope}"):
+        df = similar(entity, name, season, season_type, all_seasons=scope == "All seasons")
+    st.dataframe(
+        df.rename(columns={
+            entity.name_col: entity.label,
+            "season": "Season",
+            SIMILARITY_COL: "Similarity",
+            **dict(zip(entity.metrics, entity.card_labels)),
+        }).round(2),
+        hide_index=True,
+        use_container_width=True
+    )
+    st.caption("Cosine similarity of per-game profiles, each standardized against its own season's league.")
+
+@st.fragment
+def compare_panel(entity, name, season, season_type):
+    """
+    Several players/teams over several seasons, fetched in one batch. Names
+    to add come from the search index, like the main picker.
+    """
+    st.subheader(f"Compare {entity.plural}")
+    key = f"compare_{entity.noun}"
+    query = st.text_input(f"Add {entity.plural}…", key=f"{key}_search")
+    picked = st.session_state.get(key, [name])
+    # The page's own entity stays an option (it is the default) even once removed.
+    options = list(dict.fromkeys([name] + picked + (search_names(entity, query) if query.strip() else [])))
+    names = st.multiselect(entity.plural.capitalize(), options, default=[name], key=key,
+                           max_selections=MAX_COMPARE)
+    seasons = st.multiselect("Seasons", SEASONS, default=[season], key="compare_seasons")
+    if not names or not seasons:
+        st.info(f"Pick at least one {entity.noun} and one season.")
+        return
+
+    with span("compare", f"{entity.table} {len(names)}x{len(seasons)}"):
+        df = compare(entity, names, sorted(seasons), season_type)
+    metrics, labels = list(entity.metrics), list(entity.card_labels)
+
+    left, right = st.columns(2)
+    with span("figure", f"compare radar {entity.table}"):
+        radar = radar_figure(df, entity.name_col, metrics, labels, "League percentile")
+    left.plotly_chart(radar, use_container_width=True)
+
+    label = right.selectbox("Metric", labels, key="compare_metric")
+    metric = metrics[labels.index(label)]
+    with span("figure", f"compare bars {entity.table}.{metric}"):
+        bars = grouped_bar_figure(df, entity.name_col, metric, label, f"{label} by season")
+    right.plotly_chart(bars, use_container_width=True)
+
+    st.dataframe(
+        df[[entity.name_col, "season"] + metrics].rename(columns={
+            entity.name_col: entity.label,
+            "season": "Season",
+            **dict(zip(metrics, labels)),
+        }).round(2),
+        hide_index=True,
+        use_container_width=True
+    )
+    st.caption("Percentiles are the share of that season's league at or below each value.")
 
 if "analysis_ready" not in st.session_state:
     st.session_state.analysis_ready = False
 
 with st.sidebar.form("filter_form"):
     st.header("Stats to Display")
-    stat_choice = st.radio("", ["Player stats", "Team stats"])
+    stat_choice = st.radio("", list(STAT_CHOICES))
     st.divider()
 
     st.subheader("Season")
-    season = st.radio("", ["2024-25","2023-24","2022-23","2021-22","2020-21"])
+    season = st.radio("", SEASONS)
     st.divider()
 
     st.subheader("Type")
@@ -37,275 +177,91 @@ st.sidebar.divider()
 st.sidebar.header("Predictive model")
 st.sidebar.write("Coming soon …")
 
+st.sidebar.divider()
+debug = st.sidebar.toggle("Debug timings", key="debug")
+
 if st.session_state.analysis_ready:
 
     st.header(f"📊 {stat_choice} — {season} ({season_type})")
-    engine = create_engine("sqlite:///nba.db")
-
-    if stat_choice == "Player stats":
-        players_df = pd.read_sql(
-            """
-            SELECT DISTINCT PLAYER_NAME
-            FROM players
-            WHERE season    = :season
-              AND game_type = :game_type
-            ORDER BY PLAYER_NAME
-            """,
-            engine,
-            params={"season": season, "game_type": season_type}
-        )
-        all_players = [""] + players_df["PLAYER_NAME"].tolist()
-
-        selected_player = st.selectbox(
-            "Search & select a player…",
-            all_players,
-            index=0,
-            key="selected_player"
-        )
-
-        if selected_player:
-            stats_df = pd.read_sql(
-                """
-                SELECT *
-                FROM players
-                WHERE season       = :season
-                  AND game_type    = :game_type
-                  AND PLAYER_NAME  = :player
-                """,
-                engine,
-                params={
-                    "season":    season,
-                    "game_type": season_type,
-                    "player":    selected_player
-                }
-            )
-
-
-            columns_df = pd.read_sql(
-                """
-                SELECT DISTINCT *
-                FROM players
-                WHERE season       = :season
-                  AND game_type    = :game_type
-                  AND PLAYER_NAME  = :player
-                """,
-                engine,
-                params={
-                    "season":    season,
-                    "game_type": season_type,
-                    "player":    selected_player
-                }
-            )
-            columns_list = [""] + columns_df.columns.tolist()
-
-            tab1, tab2 = st.tabs(["Overview", "Explore"])
-            with tab1:
-                st.subheader(f"Current season {selected_player} stats")
-
-                curr = get_player_stats(selected_player, season, season_type)
-                season_prev = prev_season(season)
-                try:
-                    prev = get_player_stats(selected_player, season_prev, season_type)
-                except ValueError:
-                    prev = (None,) * 6
-
-                deltas = []
-                for c, p in zip(curr, prev):
-                    if p is None:
-                        deltas.append(None)
-                    else:
-                        deltas.append(c - p)
-
-                labels = ["PPG", "APG", "RPG", "SPG", "BPG", "TOPG"]
-                cols = st.columns(6)
-                for col, label, val, delta in zip(cols, labels, curr, deltas):
-                    delta_str = f"{delta:+.1f}" if delta is not None else None
-                    col.metric(label, f"{val:.1f}", delta_str)
-                st.caption("All metrics compare current season vs. previous season averages.")
-                st.divider()
-
-                st.subheader(" How do they rank versus top players in the league?")
-
-                metric_figs = get_player_metric_figs(
-                    selected_player, season, season_type, top_n=10
-                )
-
-                rows = [st.columns(2) for _ in range(3)]
 
+    entity = STAT_CHOICES[stat_choice]
+    # Only the top matches go to the browser, never the full name list.
+    query = st.text_input(
+        f"Search for a {entity.noun}…",
+        key=f"search_{entity.noun}",
+        placeholder="A few letters are enough; accents and typos are fine"
+    )
+    matches = search_names(entity, query, season, season_type) if query.strip() else []
+    # A new query must not drop the page on screen: the current pick stays an
+    # option while it has stats in this slice.
+    current = st.session_state.get(f"selected_{entity.noun}")
+    if current and get_store(entity).row(current, season, season_type) is not None:
+        matches = list(dict.fromkeys([current] + matches))
+
+    selected = st.selectbox(
+        f"Select a {entity.noun}",
+        [""] + matches,
+        index=0,
+        key=f"selected_{entity.noun}"
+    )
+
+    if selected:
+        page = PagePlan(entity, selected, season, season_type)
+
+        view = st.radio("View", VIEWS, horizontal=True, key="view", label_visibility="collapsed")
+        if view == "Overview":
+            st.subheader(f"Current season {selected} stats")
+
+            cols = st.columns(len(entity.card_labels))
+            for col, label, val, delta in zip(cols, entity.card_labels, page.current, page.deltas):
+                delta_str = entity.delta_format.format(delta) if delta is not None else None
+                col.metric(label, entity.card_format.format(val), delta_str)
+            st.caption("All metrics compare current season vs. previous season averages.")
+            st.divider()
+
+            st.subheader(f" How do they rank versus top {entity.plural} in the league?")
+
+            rows = [st.columns(2) for _ in range((len(entity.metrics) + 1) // 2)]
+
+            metric_figs = page.metric_figs
+            with span("render", f"overview {entity.table}"):
                 for idx, (metric, fig) in enumerate(metric_figs):
                     row = rows[idx // 2]
                     col = row[idx % 2]
                     col.plotly_chart(fig, use_container_width=True)
 
-                st.info("Expand the page to see the full graph.")
-
-            with tab2:
-                columns_df = pd.read_sql(
-                    """
-                    SELECT DISTINCT *
-                    FROM players
-                    WHERE season       = :season
-                      AND game_type    = :game_type
-                    """,
-                    engine,
-                    params={
-                        "season": season,
-                        "game_type": season_type,
-                        "player": selected_player
-                    }
-                )
-
-                DISPLAY_TO_INTERNAL = {disp: key for key, disp in RENAME_MAP2.items()}
-
-                numeric_cols = (
-                    columns_df
-                    .select_dtypes(include=["number"])
-                    .columns
-                    .tolist()
-                )
-                numeric_cols = [c for c in numeric_cols if c != "PLAY"]
-
-                display_cols = [""] + [RENAME_MAP2.get(c, c) for c in numeric_cols]
-
-                players = [""] + sorted(columns_df["PLAYER_NAME"].unique().tolist())
-
-                st.subheader("Make your own chart")
-                chart_type = st.radio("Chart type", ["Scatter"], horizontal=True)
-
-                if chart_type == "Scatter":
-                    x_disp = st.selectbox("X-axis", display_cols)
-                    y_disp = st.selectbox("Y-axis", display_cols)
-
-                    x_axis = DISPLAY_TO_INTERNAL.get(x_disp, x_disp)
-                    y_axis = DISPLAY_TO_INTERNAL.get(y_disp, y_disp)
-
-                    create_graph2(x_axis, y_axis, chart_type, columns_df, selected_player)
-
-
-    if stat_choice == "Team stats":
-
-        teams_df = pd.read_sql(
-            """
-            SELECT DISTINCT TEAM_NAME
-            FROM teams
-            WHERE season    = :season
-              AND game_type = :game_type
-            ORDER BY TEAM_NAME
-            """,
-            engine,
-            params={"season": season, "game_type": season_type}
-        )
-
-        all_teams = [""] + teams_df["TEAM_NAME"].tolist()
+            st.info("Expand the page to see the full graph.")
+            st.divider()
+            similar_panel(entity, selected, season, season_type)
 
-        selected_team = st.selectbox(
-            "Search & select a team…",
-            all_teams,
-            index=0,
-            key="selected_team"
-        )
-
-        if selected_team:
-            stats_df = pd.read_sql(
-                """
-                SELECT *
-                FROM teams
-                WHERE season       = :season
-                  AND game_type    = :game_type
-                  AND TEAM_NAME  = :team
-                """,
-                engine,
-                params={
-                    "season":    season,
-                    "game_type": season_type,
-                    "team":    selected_team
-                }
-            )
-            tab1, tab2 = st.tabs(["Overview", "Explore"])
-            with tab1:
-                st.subheader(f"Current season {selected_team} stats")
-
-                curr = get_team_stats(selected_team, season, season_type)
-                season_prev = prev_season(season)
-
-                try:
-                    prev = get_team_stats(selected_team, season_prev, season_type)
-                except ValueError:
-                    prev = (None,) * 6
-
-                deltas = []
-                for c, p in zip(curr, prev):
-                    if p is None:
-                        deltas.append(None)
-                    else:
-                        deltas.append(c - p)
-
-                labels = ["Wins", "Losses", "Win %", "PPG", "FG %", "3PT %"]
-                cols = st.columns(6)
-                for col, label, val, delta in zip(cols, labels, curr, deltas):
-                    delta_str = f"{delta:+.2f}" if delta is not None else None
-                    col.metric(label, f"{val}", delta_str)
-                st.caption("All metrics compare current season vs. previous season averages.")
-
-                st.divider()
-
-                st.subheader(" How do they rank versus top teams in the league?")
-
-                metric_figs = get_team_metric_figs(
-                    selected_team, season, season_type, top_n=10
-                )
-
-                rows = [st.columns(2) for _ in range(3)]
-
-                for idx, (metric, fig) in enumerate(metric_figs):
-                    row = rows[idx // 2]
-                    col = row[idx % 2]
-                    col.plotly_chart(fig, use_container_width=True)
-
-                st.info("Expand the page to see the full graph.")
-            with tab2:
-                columns_df = pd.read_sql(
-                    """
-                    SELECT DISTINCT *
-                    FROM teams
-                    WHERE season       = :season
-                      AND game_type    = :game_type
-                    """,
-                    engine,
-                    params={
-                        "season": season,
-                        "game_type": season_type,
-                        "player": selected_team
-                    }
-                )
-                DISPLAY_TO_INTERNAL = {disp: key for key, disp in RENAME_MAP.items()}
-
-                numeric_cols = (
-                    columns_df
-                    .select_dtypes(include=["number"])
-                    .columns
-                    .tolist()
-                )
-                numeric_cols = [c for c in numeric_cols if c != "TEAM_ID"]
-
-                display_cols = [""] + [RENAME_MAP.get(c, c) for c in numeric_cols]
-
-                teams = [""] + sorted(columns_df["TEAM_NAME"].unique().tolist())
-
-                st.subheader("Make your own chart")
-                chart_type = st.radio("Chart type", ["Scatter"], horizontal=True)
-
-                if chart_type == "Scatter":
-                    x_disp = st.selectbox("X-axis", display_cols)
-                    y_disp = st.selectbox("Y-axis", display_cols)
-
-                    x_axis = DISPLAY_TO_INTERNAL.get(x_disp, x_disp)
-                    y_axis = DISPLAY_TO_INTERNAL.get(y_disp, y_disp)
-
-                    create_graph(x_axis, y_axis, chart_type, columns_df, selected_team)
+        if view == "Explore":
+            explore_panel(entity, selected, season, season_type)
 
+        if view == "Career":
+            career_panel(entity, selected, season, season_type)
 
+        if view == "Compare":
+            compare_panel(entity, selected, season, season_type)
 
+    st.caption(f"{query_count()} database queries on this page")
 
 else:
-    st.info("Pick your metrics in the sidebar and click **Analyse** to load the data.")
\ No newline at end of file
+    st.info("Pick your metrics in the sidebar and click **Analyse** to load the data.")
+
+summary = finish_rerun(stat_choice)
+if debug:
+    with st.sidebar.expander("Rerun timings", expanded=True):
+        st.caption(f"{summary['ms']:.0f} ms, {query_count()} queries this rerun")
+        st.dataframe(
+            pd.DataFrame.from_dict(summary["totals"], orient="index"),
+            use_container_width=True
+        )
+        st.dataframe(
+            pd.DataFrame(summary["spans"], columns=["kind", "label", "rows", "ms"]),
+            use_container_width=True
+        )
+        st.caption("Across sessions (ms)")
+        st.dataframe(
+            pd.DataFrame.from_dict(percentiles(), orient="index").round(1),
+            use_container_width=True
+        )
@@ -0,0 +1,258 @@
+import argparse
+import contextlib
+import csv
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from streamlit.logger import set_log_level
+
+import career
+import ingest
+import search
+import similar
+from cache import reset_all
+from entities import ENTITIES, PLAYERS, TEAMS
+from explore import create_graph, load_axes
+from metrics import compare as compare_entities, get_player_metric_figs, get_player_stats, get_team_metric_figs
+from schema import KEY_COLUMNS, NAME_COLUMNS
+from store import get_store
+
+# Ingest is benchmarked up to 100x: about 20 minutes, over 6 GB of disk and under
+# 3 GB peak RSS on one core. 1000x still runs through --scales but needs ten
+# times all of that, mostly for the rank tables.
+SCALES = [10, 100]
+REPEATS = 5
+# Scale is spread over more seasons first (up to MAX_SEASONS, i.e. decades of
+# history), then over more rows per season (G-League/international players).
+MAX_SEASONS = 50
+NOISE = 0.15
+# A warm median this much slower than the baseline is flagged by --compare.
+REGRESSION_RATIO = 1.25
+# Below this, timer noise dominates and ratios are not meaningful.
+MIN_COMPARABLE_MS = 1.0
+
+SOURCE_DB = os.path.abspath("nba.db")
+FIELDS = ["scale", "players_rows", "teams_rows", "benchmark", "phase", "n",
+          "median_ms", "p95_ms", "min_ms"]
+
+
+def load_source(path: str = SOURCE_DB) -> dict:
+    """
+    The shipped tables as raw API frames: {table: {game_type: [slice_df, ...]}}.
+    """
+    con = sqlite3.connect(path)
+    source = {}
+    try:
+        for table, entity in ENTITIES.items():
+            df = pd.read_sql(f"SELECT * FROM {table}", con).drop(columns=list(entity.per_game))
+            source[table] = {
+                game_type: [g.drop(columns=["season", "game_type"]).reset_index(drop=True)
+                            for _, g in slices.groupby("season")]
+                for game_type, slices in df.groupby("game_type")
+            }
+    finally:
+        con.close()
+    return source
+
+
+def synthetic_seasons(scale: int, base_seasons: int = 5) -> list:
+    count = min(base_seasons * scale, MAX_SEASONS)
+    return [f"{year}-{(year + 1) % 100:02d}" for year in range(2024 - count + 1, 2025)]
+
+
+def clone_slice(df: pd.DataFrame, table: str, copies: int, rng) -> pd.DataFrame:
+    """
+    `copies` noisy clones of one real slice. Clone 0 keeps the real ids and
+    names so lookups like "LeBron James" still resolve; clone k gets id
+    `id + k * 10_000_000` and the name suffix " k", stable across seasons.
+    """
+    id_col, name_col = KEY_COLUMNS[table][0], NAME_COLUMNS[table]
+    df = df.drop_duplicates(subset=id_col)
+    numeric = [c for c in df.select_dtypes(include=["number"]).columns
+               if c not in (id_col, "TEAM_ID") and not c.endswith("_RANK")]
+
+    frames = []
+    for k in range(copies):
+        clone = df.copy()
+        if k:
+            clone[id_col] = clone[id_col] + k * 10_000_000
+            clone[name_col] = clone[name_col] + f" {k}"
+            noise = rng.lognormal(0.0, NOISE, size=(len(clone), len(numeric)))
+            values = clone[numeric].to_numpy(dtype=float) * noise
+            for j, col in enumerate(numeric):
+                if col.endswith("_PCT"):
+                    clone[col] = values[:, j].clip(0, 1).round(3)
+                elif pd.api.types.is_integer_dtype(df[col]):
+                    clone[col] = values[:, j].round().astype(df[col].dtype)
+                else:
+                    clone[col] = values[:, j].round(1)
+        frames.append(clone)
+    return pd.concat(frames, ignore_index=True)
+
+
+class SyntheticEndpoint:
+    """
+    Stands in for an nba_api endpoint class: same call signature, serves the
+    pre-generated slice for (season, game type).
+    """
+
+    def __init__(self, slices: dict):
+        self.slices = slices
+
+    def __call__(self, season, season_type_all_star, timeout=None):
+        self._df = self.slices[(season, season_type_all_star)]
+        return self
+
+    def get_data_frames(self):
+        return [self._df.copy()]
+
+
+def synthetic_endpoints(source: dict, scale: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    seasons = synthetic_seasons(scale)
+    copies = max(1, round(scale * 5 / len(seasons)))
+
+    endpoints = {}
+    for table, by_game_type in source.items():
+        slices = {}
+        for game_type, real in by_game_type.items():
+            for i, season in enumerate(seasons):
+                slices[(season, game_type)] = clone_slice(real[i % len(real)], table, copies, rng)
+        endpoints[table] = SyntheticEndpoint(slices)
+    return endpoints, seasons
+
+
+def measure(fn, repeats: int = REPEATS) -> dict:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    times = np.array(times)
+    return {"n": len(times), "median_ms": np.median(times),
+            "p95_ms": np.percentile(times, 95), "min_ms": times.min()}
+
+
+def pick(names: list, preferred: str) -> str:
+    return preferred if preferred in names else names[len(names) // 2]
+
+
+def run_scale(scale: int, source: dict, repeats: int = REPEATS) -> list:
+    endpoints, seasons = synthetic_endpoints(source, scale)
+    season, game_type = seasons[-1], "Regular Season"
+    rows = []
+
+    def add(name, phase, stats):
+        rows.append({"benchmark": name, "phase": phase, **stats})
+
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            reset_all()
+            limiter = ingest.TokenBucket(rate=1e9, burst=1_000_000)
+            with contextlib.redirect_stdout(io.StringIO()):
+                add("ingest", "cold", measure(lambda: ingest.run_ingest(
+                    list(endpoints), endpoints=endpoints, seasons=seasons, limiter=limiter), repeats=1))
+            reset_all()
+
+            player = pick(get_store(PLAYERS).names(season, game_type), "LeBron James")
+            team = pick(get_store(TEAMS).names(season, game_type), "Boston Celtics")
+            roster = get_store(PLAYERS).names(season, game_type)
+
+            benchmarks = {
+                "get_player_stats": lambda: get_player_stats(player, season, game_type),
+                "get_player_metric_figs": lambda: get_player_metric_figs(player, season, game_type),
+                "get_team_metric_figs": lambda: get_team_metric_figs(team, season, game_type),
+                "career_trajectory": lambda: career.trajectory(
+                    PLAYERS, career.entity_id(PLAYERS, player, season, game_type)),
+                "player_search": lambda: search.search_names(PLAYERS, player[:4] + "x", season, game_type),
+                "similar_players": lambda: similar.similar(PLAYERS, player, season, game_type, all_seasons=True),
+                "compare_2_players": lambda: compare_entities(PLAYERS, roster[:2], seasons[-5:], game_type),
+                "compare_20_players": lambda: compare_entities(PLAYERS, roster[:20], seasons[-5:], game_type),
+                "explore_scatter": lambda: create_graph(
+                    PLAYERS, "PTS", "AST", "Scatter",
+                    load_axes("players", "PTS", "AST", season, game_type), player),
+                "explore_scatter_all_seasons": lambda: create_graph(
+                    PLAYERS, "PTS", "AST", "Scatter",
+                    load_axes("players", "PTS", "AST", None, game_type), player),
+            }
+            for name, fn in benchmarks.items():
+                reset_all()
+                add(name, "cold", measure(fn, repeats=1))
+                add(name, "warm", measure(fn, repeats=repeats))
+
+            con = sqlite3.connect("nba.db")
+            counts = {t: con.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ("players", "teams")}
+            con.close()
+        finally:
+            reset_all()
+            os.chdir(cwd)
+
+    for row in rows:
+        row.update(scale=scale, players_rows=counts["players"], teams_rows=counts["teams"])
+    return rows
+
+
+def compare(rows: list, baseline_path: str) -> list:
+    """
+    Joins `rows` with a saved CSV on (scale, benchmark, phase) and returns the
+    warm rows whose median grew by more than REGRESSION_RATIO.
+    """
+    with open(baseline_path, newline="") as fh:
+        baseline = {(int(r["scale"]), r["benchmark"], r["phase"]): float(r["median_ms"])
+                    for r in csv.DictReader(fh)}
+    regressions = []
+    for row in rows:
+        before = baseline.get((row["scale"], row["benchmark"], row["phase"]))
+        row["baseline_ms"] = before
+        row["ratio"] = row["median_ms"] / before if before else None
+        if (row["phase"] == "warm" and row["ratio"] and row["ratio"] > REGRESSION_RATIO
+                and before >= MIN_COMPARABLE_MS):
+            regressions.append(row)
+    return regressions
+
+
+def write_csv(rows: list, fh):
+    fields = FIELDS + [f for f in ("baseline_ms", "ratio") if any(f in r for r in rows)]
+    writer = csv.DictWriter(fh, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({k: round(v, 3) if isinstance(v, float) else v for k, v in row.items()})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard on synthetic data.")
+    parser.add_argument("--scales", type=int, nargs="+", default=SCALES,
+                        help="multiples of the shipped data to generate (default: 10 100)")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="warm runs per benchmark")
+    parser.add_argument("--out", help="write the CSV here instead of stdout")
+    parser.add_argument("--compare", help="baseline CSV to diff against; exits 1 on a regression")
+    args = parser.parse_args()
+
+    # create_graph draws through st.plotly_chart, which only warns outside `streamlit run`.
+    set_log_level("error")
+    source = load_source()
+    rows = []
+    for scale in args.scales:
+        print(f"Benchmarking {scale}x ...", file=sys.stderr)
+        rows.extend(run_scale(scale, source, repeats=args.repeats))
+
+    regressions = compare(rows, args.compare) if args.compare else []
+
+    if args.out:
+        with open(args.out, "w", newline="") as fh:
+            write_csv(rows, fh)
+    else:
+        write_csv(rows, sys.stdout)
+
+    for row in regressions:
+        print(f"Regression: {row['benchmark']} at {row['scale']}x is {row['ratio']:.2f}x the baseline",
+              file=sys.stderr)
+    sys.exit(1 if regressions else 0)
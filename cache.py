@@ -0,0 +1,237 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from db import dispose_engines, get_engine
+from profiling import span
+from schema import get_data_version
+
+MEMORY_BUDGET_BYTES = int(os.environ.get("NBA_CACHE_MB", "128")) * 1024 * 1024
+TTL_SECONDS = float(os.environ.get("NBA_CACHE_TTL", "3600"))
+# Optional second tier shared by every process on the host.
+DISK_DIR = os.environ.get("NBA_CACHE_DIR")
+
+# How long a data_version read is trusted before SQLite is asked again.
+VERSION_CHECK_SECONDS = 2.0
+
+
+def _sizeof(value) -> int:
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum())
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class ResultCache:
+    """
+    Two-tier cache: an in-process LRU bounded by `max_bytes`, backed by an
+    optional pickle directory. Entries are tagged with the data version they
+    were built from and expire after `ttl` seconds.
+    """
+
+    def __init__(self, max_bytes: int = MEMORY_BUDGET_BYTES, ttl: float = TTL_SECONDS, disk_dir: str = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()   # key -> (version, stored_at, nbytes, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get_or_load(self, key, version: int, loader):
+        value = self._get_memory(key, version)
+        if value is not None:
+            return value
+
+        # Single-flight: concurrent sessions asking for the same key wait for
+        # the first one instead of all hitting SQLite.
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        try:
+            with key_lock:
+                value = self._get_memory(key, version)
+                if value is not None:
+                    return value
+
+                value = self._get_disk(key, version)
+                if value is None:
+                    with self._lock:
+                        self.stats["misses"] += 1
+                    value = loader()
+                    self._put_disk(key, version, value)
+
+                self._put_memory(key, version, value)
+        finally:
+            # Also when the loader raises, or every failing key (e.g. an
+            # unknown name) would leave its lock behind.
+            with self._lock:
+                self._key_locks.pop(key, None)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _get_memory(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry_version, stored_at, nbytes, value = entry
+            if entry_version != version or time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self._bytes -= nbytes
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def _put_memory(self, key, version, value):
+        nbytes = _sizeof(value)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (version, time.monotonic(), nbytes, value)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.stats["evictions"] += 1
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.pkl")
+
+    def _get_disk(self, key, version):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                self._remove_disk(path)
+                return None
+            with open(path, "rb") as fh:
+                entry_version, value = pickle.load(fh)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self._remove_disk(path)
+            return None
+        if entry_version != version:
+            # Expired and superseded files are pruned as they are found, so
+            # the directory holds at most one file per key.
+            self._remove_disk(path)
+            return None
+        with self._lock:
+            self.stats["disk_hits"] += 1
+        return value
+
+    @staticmethod
+    def _remove_disk(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _put_disk(self, key, version, value):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as fh:
+                pickle.dump((version, value), fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+
+_cache = ResultCache(disk_dir=DISK_DIR)
+_versions = {}
+_versions_lock = threading.Lock()
+_resets = []
+
+
+def on_reset(clear):
+    """
+    Registers `clear` to run from `reset_all`. Modules holding their own
+    process-level memo call this at import.
+    """
+    _resets.append(clear)
+    return clear
+
+
+def reset_all():
+    """
+    Drops every process-level cache and pooled connection so the next call is
+    genuinely cold, e.g. between benchmark scales or test databases.
+    """
+    dispose_engines()
+    _cache.clear()
+    with _versions_lock:
+        _versions.clear()
+    for clear in _resets:
+        clear()
+
+
+def data_version(table: str) -> int:
+    """
+    Returns the ingest stamp for `table`, re-reading it from SQLite at most
+    every VERSION_CHECK_SECONDS.
+    """
+    now = time.monotonic()
+    cached = _versions.get(table)
+    if cached is not None and now - cached[1] < VERSION_CHECK_SECONDS:
+        return cached[0]
+
+    with span("sql", "SELECT version FROM data_version", table=table, rows=1):
+        con = get_engine().raw_connection()
+        try:
+            version = get_data_version(con, table)
+        finally:
+            con.close()
+
+    with _versions_lock:
+        _versions[table] = (version, now)
+    return version
+
+
+def read_sql(sql: str, params: dict = None) -> pd.DataFrame:
+    """
+    `pd.read_sql` on the shared engine, timed as one "sql" span.
+    """
+    with span("sql", " ".join(sql.split()), params=params) as record:
+        df = pd.read_sql(sql, get_engine(), params=params)
+        record["rows"] = len(df)
+    return df
+
+
+def read_sql_cached(table, season: str, game_type: str, shape: str, sql: str, params: dict = None):
+    """
+    `pd.read_sql` through the shared cache, keyed on (table, season, game_type,
+    query shape). `table` is the table the query reads, or a list of every
+    table it joins, whose versions then all tag the entry. Callers get a
+    shallow copy so adding columns never leaks back into the cached frame.
+    """
+    params = params or {}
+    tables = (table,) if isinstance(table, str) else tuple(table)
+    key = (tables, season, game_type, shape, sql, tuple(sorted(params.items())))
+    df = _cache.get_or_load(
+        key,
+        tuple(data_version(t) for t in tables),
+        lambda: read_sql(sql, params=params)
+    )
+    return df.copy(deep=False)
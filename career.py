@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+from cache import read_sql_cached
+from store import get_store, per_store, slice_moments
+
+ROLLING_WINDOW = 3
+DELTA_SUFFIX = "_DELTA"
+ROLLING_SUFFIX = "_ROLLING"
+Z_SUFFIX = "_Z"
+
+
+def entity_id(entity, name: str, season: str, game_type: str):
+    """
+    The stable id (PLAYER_ID / TEAM_ID) behind a name in one slice, so a
+    career follows the person even when two share a name.
+    """
+    values = get_store(entity).values(name, season, game_type, [entity.key[0]])
+    if values is None:
+        raise ValueError(f"No stats for {name} in season={season}, game_type={game_type}")
+    return int(values[0])
+
+
+def league_moments(entity, metrics: list) -> dict:
+    """
+    {(season, game_type): (mean, std)} per metric for every slice, computed
+    from the in-memory store and memoized per store version.
+    """
+    def build(store):
+        values = np.column_stack([store.columns[m].astype(float) for m in metrics])
+        mean, std = slice_moments(store, values)
+        return {slice_key: (mean[i], std[i]) for i, (slice_key, _) in enumerate(store.slices())}
+
+    return per_store(entity, ("moments", tuple(metrics)), build)
+
+
+def load_history(entity, entity_id: int, metrics: list) -> pd.DataFrame:
+    """
+    Every season and game type for one id in a single query, a range scan on
+    the (id, season, game_type) key index.
+    """
+    id_col = entity.key[0]
+    columns = ", ".join(["season", "game_type", entity.name_col] + metrics)
+    return read_sql_cached(
+        entity.table, None, None, f"career:{','.join(metrics)}",
+        f"""
+        SELECT {columns}
+          FROM {entity.table}
+         WHERE {id_col} = :entity_id
+         ORDER BY season, game_type
+        """,
+        params={"entity_id": entity_id}
+    )
+
+
+def trajectory(entity, entity_id: int, metrics: list = None, window: int = ROLLING_WINDOW) -> pd.DataFrame:
+    """
+    The career of one player/team, one row per (game_type, season), with each
+    metric's season-over-season delta, trailing `window`-season average and
+    z-score against that season's league, all computed as whole-array NumPy
+    operations over the history.
+    """
+    metrics = metrics or list(entity.metrics)
+    history = load_history(entity, entity_id, metrics)
+    if history.empty:
+        raise ValueError(f"No history for {entity.key[0]}={entity_id}")
+
+    history = history.sort_values(["game_type", "season"], kind="stable").reset_index(drop=True)
+    n = len(history)
+    values = history[metrics].to_numpy(dtype=float)
+    game_types = history["game_type"].to_numpy()
+
+    # Rows are sorted by (game type, season start year); one sortable key per
+    # row puts every game type's seasons in a range of their own.
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = game_types[1:] != game_types[:-1]
+    years = history["season"].str[:4].astype(int).to_numpy()
+    keys = (np.cumsum(new_group) - 1) * 10_000 + years
+
+    # Only a directly preceding season counts: a missed year (no playoffs,
+    # injury) leaves the delta empty, as on the Overview.
+    deltas = np.full_like(values, np.nan)
+    consecutive = keys[1:] - keys[:-1] == 1
+    deltas[1:][consecutive] = values[1:][consecutive] - values[:-1][consecutive]
+
+    # Trailing mean over the last `window` seasons (not rows) from cumulative
+    # sums; the window never reaches into another game type.
+    present = ~np.isnan(values)
+    csum = np.vstack([np.zeros(len(metrics)), np.cumsum(np.where(present, values, 0.0), axis=0)])
+    ccount = np.vstack([np.zeros(len(metrics)), np.cumsum(present, axis=0)])
+    window_start = np.searchsorted(keys, keys - window + 1, side="left")
+    rows = np.arange(n) + 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rolling = (csum[rows] - csum[window_start]) / (ccount[rows] - ccount[window_start])
+
+    moments = league_moments(entity, metrics)
+    nan = np.full(len(metrics), np.nan)
+    mean = np.array([moments.get(k, (nan, nan))[0] for k in zip(history["season"], game_types)])
+    std = np.array([moments.get(k, (nan, nan))[1] for k in zip(history["season"], game_types)])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (values - mean) / std
+
+    out = [history[["season", "game_type", entity.name_col]]]
+    for suffix, block in [("", values), (DELTA_SUFFIX, deltas), (ROLLING_SUFFIX, rolling), (Z_SUFFIX, z)]:
+        out.append(pd.DataFrame(block, columns=[m + suffix for m in metrics]))
+    return pd.concat(out, axis=1)
@@ -0,0 +1,346 @@
+import copy
+import json
+import os
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from cache import ResultCache, data_version, on_reset
+from career import DELTA_SUFFIX, ROLLING_SUFFIX, Z_SUFFIX
+from derived import PERCENTILE_SUFFIX
+from leaderboard import get_leaderboards
+from profiling import span
+from ranks import ranks_table
+
+TEMPLATE = "plotly_dark"
+
+# Serialized leaderboard figures, keyed on (table, season, game_type, metric,
+# highlighted entity, top_n) and tagged with the data they were drawn from.
+FIGURE_BUDGET_BYTES = int(os.environ.get("NBA_FIGURE_CACHE_MB", "32")) * 1024 * 1024
+_figures = ResultCache(max_bytes=FIGURE_BUDGET_BYTES)
+on_reset(_figures.clear)
+
+# Explore scatter: above WEBGL_THRESHOLD points are drawn with WebGL; above
+# AGGREGATE_THRESHOLD "Auto" bins them on the server instead of shipping them.
+WEBGL_THRESHOLD = 2_000
+AGGREGATE_THRESHOLD = 20_000
+HEX_GRIDSIZE = 40
+HEATMAP_BINS = 60
+SCATTER_MODES = ["Auto", "Points", "Hexbin", "Heatmap"]
+
+_base_layout = None
+
+
+def base_layout() -> dict:
+    """
+    The layout every bar chart shares (resolved template, axes, legend),
+    built once per process. Callers get a deep copy to fill in.
+    """
+    global _base_layout
+    if _base_layout is None:
+        _base_layout = {
+            "template": pio.templates[TEMPLATE].to_plotly_json(),
+            "xaxis": {"anchor": "y", "domain": [0.0, 1.0]},
+            "yaxis": {"anchor": "x", "domain": [0.0, 1.0]},
+            "legend": {"tracegroupgap": 0},
+            "barmode": "relative",
+            "showlegend": False,
+        }
+    return copy.deepcopy(_base_layout)
+
+
+def bar_figure(df, x: str, y: str, x_label: str, y_label: str, title: str = None,
+               texttemplate: str = "%{x:.1f}", **layout) -> go.Figure:
+    """
+    The horizontal bar chart `px.bar(..., orientation="h", text=x)` would draw,
+    with bars coloured by `df["color"]`. Built from plain dicts with
+    validation off, which is several times cheaper than Plotly Express.
+    """
+    trace = {
+        "type": "bar",
+        "orientation": "h",
+        "x": df[x].tolist(),
+        "y": df[y].tolist(),
+        "text": df[x].tolist(),
+        "textposition": "outside",
+        "marker": {"color": df["color"].tolist()},
+        "hovertemplate": f"{x_label}=%{{text}}<br>{y_label}=%{{y}}<extra></extra>",
+        "name": "",
+        "legendgroup": "",
+        "showlegend": False,
+        "xaxis": "x",
+        "yaxis": "y",
+    }
+    if texttemplate is not None:
+        trace["texttemplate"] = texttemplate
+
+    fig_layout = base_layout()
+    fig_layout["xaxis"]["title"] = {"text": x_label}
+    fig_layout["yaxis"]["title"] = {"text": y_label}
+    if title is not None:
+        fig_layout["title"] = {"text": title}
+    else:
+        # Plotly Express trims the top margin when there is no title.
+        fig_layout["margin"] = {"t": 60}
+    fig_layout.update(layout)
+    return go.Figure({"data": [trace], "layout": fig_layout}, _validate=False)
+
+
+def trajectory_figure(history, metric: str, label: str, title: str) -> go.Figure:
+    """
+    One line per game type for `metric` across seasons, with its trailing
+    average dashed and the delta/z-score in the hover text.
+    """
+    traces = []
+    for game_type, rows in history.groupby("game_type", sort=False):
+        customdata = rows[[metric + DELTA_SUFFIX, metric + Z_SUFFIX]].to_numpy().tolist()
+        traces.append({
+            "type": "scatter",
+            "mode": "lines+markers",
+            "name": game_type,
+            "legendgroup": game_type,
+            "x": rows["season"].tolist(),
+            "y": rows[metric].tolist(),
+            "customdata": customdata,
+            "hovertemplate": f"%{{x}}<br>{label}=%{{y:.2f}}<br>Change=%{{customdata[0]:+.2f}}"
+                             f"<br>League z=%{{customdata[1]:+.2f}}<extra>{game_type}</extra>",
+        })
+        traces.append({
+            "type": "scatter",
+            "mode": "lines",
+            "name": f"{game_type} (rolling avg)",
+            "legendgroup": game_type,
+            "line": {"dash": "dash"},
+            "opacity": 0.6,
+            "x": rows["season"].tolist(),
+            "y": rows[metric + ROLLING_SUFFIX].tolist(),
+            "hovertemplate": f"%{{x}}<br>Rolling avg=%{{y:.2f}}<extra>{game_type}</extra>",
+        })
+
+    layout = base_layout()
+    layout.update(
+        title={"text": title},
+        showlegend=True,
+        xaxis={**layout["xaxis"], "title": {"text": "Season"}, "type": "category", "categoryorder": "category ascending"},
+        yaxis={**layout["yaxis"], "title": {"text": label}},
+    )
+    return go.Figure({"data": traces, "layout": layout}, _validate=False)
+
+
+def _compare_label(name: str, season: str, several_seasons: bool) -> str:
+    return f"{name} ({season})" if several_seasons else name
+
+
+def radar_figure(df, name_col: str, metrics: list, labels: list, title: str) -> go.Figure:
+    """
+    One closed polygon per (name, season) row of a `metrics.compare` frame,
+    each spoke the league percentile of one metric, so stats on different
+    scales share the chart. Raw values are in the hover text.
+    """
+    several_seasons = df["season"].nunique() > 1
+    theta = list(labels) + [labels[0]]
+    traces = []
+    for row in df.itertuples(index=False):
+        row = row._asdict()
+        pctl = [row[m + PERCENTILE_SUFFIX] for m in metrics]
+        if all(p != p for p in pctl):
+            continue
+        raw = [row[m] for m in metrics]
+        name = _compare_label(row[name_col], row["season"], several_seasons)
+        traces.append({
+            "type": "scatterpolar",
+            "name": name,
+            "r": [p * 100 for p in pctl] + [pctl[0] * 100],
+            "theta": theta,
+            "customdata": raw + raw[:1],
+            "fill": "toself",
+            "opacity": 0.6,
+            "hovertemplate": f"%{{theta}}=%{{customdata:.2f}}<br>Percentile=%{{r:.0f}}<extra>{name}</extra>",
+        })
+
+    layout = base_layout()
+    for key in ("xaxis", "yaxis", "barmode"):
+        layout.pop(key)
+    layout.update(
+        title={"text": title},
+        showlegend=True,
+        polar={"radialaxis": {"range": [0, 100], "ticksuffix": "%"}},
+    )
+    return go.Figure({"data": traces, "layout": layout}, _validate=False)
+
+
+def grouped_bar_figure(df, name_col: str, metric: str, label: str, title: str) -> go.Figure:
+    """
+    `metric` for every compared name side by side, one group of bars per
+    season of a `metrics.compare` frame.
+    """
+    traces = []
+    for name, rows in df.groupby(name_col, sort=False):
+        traces.append({
+            "type": "bar",
+            "name": name,
+            "x": rows["season"].tolist(),
+            "y": rows[metric].tolist(),
+            "hovertemplate": f"%{{x}}<br>{label}=%{{y:.2f}}<extra>{name}</extra>",
+        })
+
+    layout = base_layout()
+    layout.update(
+        title={"text": title},
+        showlegend=True,
+        barmode="group",
+        xaxis={**layout["xaxis"], "title": {"text": "Season"}, "type": "category", "categoryorder": "category ascending"},
+        yaxis={**layout["yaxis"], "title": {"text": label}},
+    )
+    return go.Figure({"data": traces, "layout": layout}, _validate=False)
+
+
+def hexbin(x: np.ndarray, y: np.ndarray, gridsize: int = HEX_GRIDSIZE) -> tuple:
+    """
+    Counts points per hexagonal cell, `gridsize` cells across, the way
+    matplotlib's hexbin lays out its two offset lattices. Returns the
+    occupied cells' centres and counts.
+    """
+    xmin, xmax = x.min(), x.max()
+    ymin, ymax = y.min(), y.max()
+    ny = max(int(gridsize / np.sqrt(3)), 1)
+    sx = (xmax - xmin) / gridsize or 1.0
+    sy = (ymax - ymin) / ny or 1.0
+    ix = (x - xmin) / sx
+    iy = (y - ymin) / sy
+
+    i1, j1 = np.round(ix), np.round(iy)
+    i2, j2 = np.floor(ix), np.floor(iy)
+    on_first = (ix - i1) ** 2 + 3 * (iy - j1) ** 2 < (ix - i2 - 0.5) ** 2 + 3 * (iy - j2 - 0.5) ** 2
+    # Centres on a half-step grid, as integers so one bincount does the counting.
+    ci = np.where(on_first, 2 * i1, 2 * i2 + 1).astype(np.int64)
+    cj = np.where(on_first, 2 * j1, 2 * j2 + 1).astype(np.int64)
+    rows = 2 * ny + 2
+    counts = np.bincount(ci * rows + cj)
+    cells = np.flatnonzero(counts)
+    return xmin + cells // rows * sx / 2, ymin + cells % rows * sy / 2, counts[cells]
+
+
+def scatter_figure(df, x: str, y: str, name_col: str, selected: str, x_label: str, y_label: str,
+                   title: str, selected_label: str = "Selected", others_label: str = "Others",
+                   mode: str = "Auto") -> go.Figure:
+    """
+    `y` against `x` with `selected` drawn as its own red trace on top. The
+    rest are plain SVG points, WebGL points past WEBGL_THRESHOLD, or binned
+    here into hexagons or a heatmap, so only the cells reach the browser.
+    `df` is only read, never modified.
+    """
+    xs = df[x].to_numpy(dtype=float)
+    ys = df[y].to_numpy(dtype=float)
+    finite = np.isfinite(xs) & np.isfinite(ys)
+    active = (df[name_col] == selected).to_numpy()
+    others = finite & ~active
+    if mode == "Auto":
+        mode = "Hexbin" if others.sum() > AGGREGATE_THRESHOLD else "Points"
+
+    def hover(rows):
+        names = df[name_col][rows].astype(str)
+        if "season" in df:
+            names = names + " (" + df["season"][rows].astype(str) + ")"
+        return names.tolist()
+
+    point_hover = f"<b>%{{hovertext}}</b><br><br>{x_label}=%{{x}}<br>{y_label}=%{{y}}<extra></extra>"
+    traces = []
+    if mode == "Points":
+        traces.append({
+            "type": "scattergl" if others.sum() > WEBGL_THRESHOLD else "scatter",
+            "mode": "markers",
+            "name": others_label,
+            "x": xs[others].tolist(),
+            "y": ys[others].tolist(),
+            "hovertext": hover(others),
+            "hovertemplate": point_hover,
+            "marker": {"color": "white", "symbol": "circle", "size": 1, "sizemode": "area", "sizeref": 0.05},
+        })
+    elif others.any() and mode == "Hexbin":
+        cx, cy, counts = hexbin(xs[others], ys[others])
+        traces.append({
+            "type": "scattergl",
+            "mode": "markers",
+            "name": others_label,
+            "x": cx.tolist(),
+            "y": cy.tolist(),
+            "customdata": counts.tolist(),
+            "hovertemplate": f"{x_label}≈%{{x:.3g}}<br>{y_label}≈%{{y:.3g}}<br>%{{customdata}} {others_label.lower()}<extra></extra>",
+            "marker": {
+                "symbol": "hexagon",
+                "size": 14,
+                "color": np.log1p(counts).tolist(),
+                "colorscale": "Viridis",
+                "showscale": False,
+                "line": {"width": 0},
+            },
+        })
+    elif others.any() and mode == "Heatmap":
+        counts, x_edges, y_edges = np.histogram2d(xs[others], ys[others], bins=HEATMAP_BINS)
+        # Empty cells as NaN (null in the JSON) stay transparent.
+        z = np.where(counts.T > 0, counts.T, np.nan)
+        traces.append({
+            "type": "heatmap",
+            "name": others_label,
+            "x": ((x_edges[:-1] + x_edges[1:]) / 2).tolist(),
+            "y": ((y_edges[:-1] + y_edges[1:]) / 2).tolist(),
+            "z": z.tolist(),
+            "colorscale": "Viridis",
+            "showscale": False,
+            "hovertemplate": f"{x_label}≈%{{x:.3g}}<br>{y_label}≈%{{y:.3g}}<br>%{{z}} {others_label.lower()}<extra></extra>",
+        })
+
+    chosen = finite & active
+    traces.append({
+        "type": "scatter",
+        "mode": "markers",
+        "name": selected_label,
+        "x": xs[chosen].tolist(),
+        "y": ys[chosen].tolist(),
+        "hovertext": hover(chosen),
+        "hovertemplate": point_hover,
+        "marker": {"color": "red", "symbol": "x", "size": 20, "sizemode": "area", "sizeref": 0.05},
+    })
+
+    layout = base_layout()
+    layout.update(
+        title={"text": title},
+        showlegend=True,
+        legend={**layout["legend"], "itemsizing": "constant"},
+        xaxis={**layout["xaxis"], "title": {"text": x_label}},
+        yaxis={**layout["yaxis"], "title": {"text": y_label}},
+    )
+    return go.Figure({"data": traces, "layout": layout}, _validate=False)
+
+
+def figure_from_json(spec: str) -> go.Figure:
+    return go.Figure(json.loads(spec), _validate=False)
+
+
+def leaderboard_figs(table: str, name_col: str, metrics: list, name: str, season: str, game_type: str,
+                     top_n: int, load, build) -> list:
+    """
+    Returns [(metric, fig)] for one page. Each figure's JSON is memoized per
+    (season, game_type, metric, entity); the leaderboards are only queried
+    when at least one figure is missing. `build(board, metric)` draws one.
+    """
+    version = (data_version(table), data_version(ranks_table(table)))
+    boards = None
+
+    def draw(metric):
+        nonlocal boards
+        if boards is None:
+            with span("leaderboard", f"{table} {','.join(metrics)}"):
+                boards = get_leaderboards(table, name_col, metrics, season, game_type, name, top_n, load=load)
+        with span("figure", f"leaderboard {table}.{metric}"):
+            return pio.to_json(build(boards[metric], metric), validate=False)
+
+    figs = []
+    for metric in metrics:
+        key = (table, season, game_type, metric, name, top_n)
+        spec = _figures.get_or_load(key, version, lambda metric=metric: draw(metric))
+        with span("figure", f"from cache {table}.{metric}"):
+            figs.append((metric, figure_from_json(spec)))
+    return figs
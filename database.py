@@ -1,7 +1,8 @@
-import sqlite3
 import pandas as pd
 
-con = sqlite3.connect('nba.db')
+from db import connect
+
+con = connect(readonly=True)
 
 players_db = pd.read_sql_query("SELECT * FROM players", con)
 
@@ -0,0 +1,116 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from cache import data_version
+from snapshot import current_version, swap_in
+
+DATA_PLANE_DIR = os.environ.get("NBA_DATA_PLANE_DIR", "dataplane")
+# How often the loader checks the database for a new version.
+POLL_SECONDS = 5.0
+
+
+def _table_dir(table: str, directory: str) -> str:
+    return os.path.join(directory, table)
+
+
+def published_version(table: str, directory: str = DATA_PLANE_DIR):
+    """
+    The version counter workers poll: the data version last published for
+    `table`, or None before the loader's first run.
+    """
+    return current_version(_table_dir(table, directory))
+
+
+def publish(store, directory: str = DATA_PLANE_DIR) -> int:
+    """
+    Writes a store's arrays as `.npy` files under
+    `<directory>/<table>/v<version>/` and moves the version counter to it.
+    Returns the number of rows published.
+    """
+    base = _table_dir(store.TABLE, directory)
+    tmp = os.path.join(base, f"v{store.version}.tmp")
+    os.makedirs(tmp, exist_ok=True)
+
+    arrays = store.arrays()
+    files = {}
+    for kind in ("columns", "codes"):
+        for i, (col, values) in enumerate(arrays[kind].items()):
+            files.setdefault(kind, {})[col] = f"{kind}_{i}.npy"
+            np.save(os.path.join(tmp, files[kind][col]), values)
+    for name in ("keys", "key_rows"):
+        np.save(os.path.join(tmp, f"{name}.npy"), arrays[name])
+
+    manifest = {
+        "table": store.TABLE,
+        "version": store.version,
+        "rows": len(store),
+        "order": arrays["order"],
+        "files": files,
+        "categories": {col: cats.tolist() for col, cats in arrays["categories"].items()},
+    }
+    with open(os.path.join(tmp, "manifest.json"), "w") as fh:
+        json.dump(manifest, fh)
+
+    swap_in(base, store.version)
+    return len(store)
+
+
+def attach(store_cls, version: int, directory: str = DATA_PLANE_DIR):
+    """
+    Maps the published arrays of `version` read-only into this process and
+    returns them as a store, or None when that version is not on disk. The
+    pages come from the shared page cache, so every attached worker uses the
+    same physical memory.
+    """
+    root = os.path.join(_table_dir(store_cls.TABLE, directory), f"v{version}")
+    try:
+        with open(os.path.join(root, "manifest.json")) as fh:
+            manifest = json.load(fh)
+
+        def load(name):
+            # A plain ndarray view of the mapping, so results are not memmaps.
+            return np.asarray(np.load(os.path.join(root, name), mmap_mode="r"))
+
+        arrays = {
+            "order": manifest["order"],
+            "columns": {col: load(name) for col, name in manifest["files"].get("columns", {}).items()},
+            "codes": {col: load(name) for col, name in manifest["files"].get("codes", {}).items()},
+            "categories": {col: np.array(cats, dtype=object) for col, cats in manifest["categories"].items()},
+            "keys": load("keys.npy"),
+            "key_rows": load("key_rows.npy"),
+        }
+    except (OSError, ValueError):
+        # Pruned between reading the counter and opening the files.
+        return None
+    return store_cls.from_arrays(arrays, version, shared=True)
+
+
+def serve(store_classes: list, interval: float = POLL_SECONDS, once: bool = False,
+          directory: str = DATA_PLANE_DIR):
+    """
+    The loader loop: whenever a table's data version moves past what is
+    published, builds its store once and publishes it for the workers.
+    """
+    while True:
+        for store_cls in store_classes:
+            version = data_version(store_cls.TABLE)
+            if version != published_version(store_cls.TABLE, directory):
+                rows = publish(store_cls.from_db(version), directory)
+                print(f"{store_cls.TABLE}: published v{version} ({rows} rows)", flush=True)
+        if once:
+            return
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    from store import STORE_CLASSES
+
+    parser = argparse.ArgumentParser(description="Publish the stores for NBA_STORE_SOURCE=dataplane workers.")
+    parser.add_argument("--once", action="store_true", help="publish what is stale and exit")
+    parser.add_argument("--interval", type=float, default=POLL_SECONDS, help="seconds between checks")
+    args = parser.parse_args()
+    serve(list(STORE_CLASSES.values()), interval=args.interval, once=args.once)
@@ -0,0 +1,107 @@
+import sqlite3
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+DB_PATH = "nba.db"
+
+# Per-connection tuning. The page cache is per connection, so keep it modest
+# and let the shared mmap region do the heavy lifting across the pool.
+PRAGMAS = {
+    "mmap_size":    256 * 1024 * 1024,
+    "cache_size":   -16 * 1024,   # KiB when negative
+    "temp_store":   "MEMORY",
+    "busy_timeout": 5000,
+}
+
+# sqlite3 keeps compiled statements per connection keyed on the SQL text, so
+# the fixed query strings in metrics.py/app.py are prepared once per connection.
+STATEMENT_CACHE_SIZE = 256
+
+POOL_SIZE = 8
+MAX_OVERFLOW = 8
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+# Statements executed on this thread since the last reset; Streamlit runs each
+# session's rerun on its own thread, so this is a per-page query counter.
+_local = threading.local()
+
+
+def _count_statement(statement):
+    _local.queries = getattr(_local, "queries", 0) + 1
+
+
+def reset_query_count():
+    _local.queries = 0
+
+
+def query_count() -> int:
+    return getattr(_local, "queries", 0)
+
+
+def connect(readonly: bool = False, path: str = DB_PATH) -> sqlite3.Connection:
+    """
+    Opens a tuned sqlite3 connection. Writable connections also switch the
+    database to WAL so readers are never blocked by an ingest run.
+    """
+    if readonly:
+        con = sqlite3.connect(
+            f"file:{path}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+    else:
+        con = sqlite3.connect(
+            path,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        con.execute("PRAGMA journal_mode = WAL")
+        con.execute("PRAGMA synchronous = NORMAL")
+
+    for name, value in PRAGMAS.items():
+        con.execute(f"PRAGMA {name} = {value}")
+    if readonly:
+        # Pages only read. On the writer the callback would fire once per row
+        # of every bulk insert.
+        con.set_trace_callback(_count_statement)
+    else:
+        # Index builds over the rank tables sort millions of rows; let them
+        # spill to disk instead of holding the whole sort in memory.
+        con.execute("PRAGMA temp_store = FILE")
+    return con
+
+
+def get_engine(readonly: bool = True, path: str = DB_PATH):
+    """
+    Returns the process-wide SQLAlchemy engine for `path`. The engine is created
+    once and shared by every module, thread and Streamlit session.
+    """
+    key = (path, readonly)
+    engine = _engines.get(key)
+    if engine is not None:
+        return engine
+
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = create_engine(
+                "sqlite://",
+                creator=lambda: connect(readonly=readonly, path=path),
+                poolclass=QueuePool,
+                pool_size=POOL_SIZE,
+                max_overflow=MAX_OVERFLOW,
+            )
+            _engines[key] = engine
+    return engine
+
+
+def dispose_engines():
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
@@ -0,0 +1,150 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from db import connect
+from entities import ENTITIES
+from schema import (KEY_COLUMNS, NAME_COLUMNS, read_slice, replace_slices, replace_table, slice_keys, table_columns,
+                    table_exists)
+
+COUNTING_STATS = [
+    "MIN", "FGM", "FGA", "FG3M", "FG3A", "FTM", "FTA", "OREB", "DREB", "REB",
+    "AST", "TOV", "STL", "BLK", "BLKA", "PF", "PFD", "PTS", "PLUS_MINUS",
+]
+
+
+def _div(num, den):
+    num = np.asarray(num, dtype=float)
+    den = np.asarray(den, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = num / den
+    out[~np.isfinite(out)] = np.nan
+    return out
+
+
+def per_game(col):
+    return lambda df: _div(df[col], df["GP"])
+
+
+def per_36(col):
+    return lambda df: _div(df[col] * 36, df["MIN"])
+
+
+def true_shooting(df):
+    return _div(df["PTS"], 2 * (df["FGA"] + 0.44 * df["FTA"]))
+
+
+def effective_fg(df):
+    return _div(df["FGM"] + 0.5 * df["FG3M"], df["FGA"])
+
+
+def usage_per_36(df):
+    # Possessions used per 36 minutes; a box-score proxy for usage rate.
+    return _div((df["FGA"] + 0.44 * df["FTA"] + df["TOV"]) * 36, df["MIN"])
+
+
+def ast_to_tov(df):
+    return _div(df["AST"], df["TOV"])
+
+
+# name -> (label, function of the slice DataFrame, tables it applies to).
+# Adding a metric is a new entry here; ingest materializes it automatically.
+REGISTRY = {}
+
+for _col in COUNTING_STATS:
+    REGISTRY[f"{_col}_PG"] = (f"{_col} per game", per_game(_col), ("players", "teams"))
+for _col in ["PTS", "REB", "AST", "STL", "BLK", "TOV", "FGA", "FG3M"]:
+    REGISTRY[f"{_col}_PER36"] = (f"{_col} per 36 min", per_36(_col), ("players",))
+
+REGISTRY.update({
+    "TS_PCT":     ("True shooting %",      true_shooting, ("players", "teams")),
+    "EFG_PCT":    ("Effective FG %",       effective_fg,  ("players", "teams")),
+    "USG_PER36":  ("Possessions used per 36 min", usage_per_36, ("players",)),
+    "AST_TO_TOV": ("Assist to turnover ratio",    ast_to_tov,   ("players", "teams")),
+})
+
+PERCENTILE_SUFFIX = "_PCTL"
+
+
+def metrics_for(table: str) -> list:
+    return [name for name, (_, _, tables) in REGISTRY.items() if table in tables]
+
+
+def labels_for(table: str) -> dict:
+    labels = {}
+    for name in metrics_for(table):
+        labels[name] = REGISTRY[name][0]
+        labels[name + PERCENTILE_SUFFIX] = f"{REGISTRY[name][0]} (league percentile)"
+    return labels
+
+
+def add_per_game(df: pd.DataFrame, table: str) -> pd.DataFrame:
+    """
+    Adds the entity's per-game columns to a fetched slice, rounded like the
+    dashboard shows them. metrics.py and the ranking indexes read these.
+    """
+    cols = ENTITIES[table].per_game
+    if not cols:
+        return df
+    for name, col in cols.items():
+        df[name] = df[col] / df['GP']
+    df[list(cols)] = df[list(cols)].round(1)
+    return df
+
+
+def derive(df: pd.DataFrame, table: str) -> pd.DataFrame:
+    """
+    Computes every registry metric for `table` plus its league percentile
+    within each (season, game_type), all as whole-column operations.
+    """
+    key = KEY_COLUMNS[table]
+    out = df[key + [NAME_COLUMNS[table]]].copy()
+    names = metrics_for(table)
+
+    values = {name: REGISTRY[name][1](df) for name in names}
+    out = pd.concat([out, pd.DataFrame(values, index=df.index)], axis=1)
+
+    pctl = out.groupby(["season", "game_type"])[names].rank(method="max", pct=True)
+    pctl.columns = [name + PERCENTILE_SUFFIX for name in names]
+    return pd.concat([out, pctl], axis=1)
+
+
+def derived_table(table: str) -> str:
+    return f"{table}_derived"
+
+
+def materialize(con, table: str, slices: list = None) -> int:
+    """
+    Rebuilds `<table>_derived` from the base table. With `slices` (the
+    (season, game_type) pairs an ingest changed) only their rows are replaced;
+    otherwise, or when the registry no longer matches the table's columns,
+    every slice is derived into a shadow copy, indexed on (key) and
+    (season, game_type, name), and swapped in atomically.
+    """
+    if not table_exists(con, table):
+        return 0
+
+    target = derived_table(table)
+    # Percentiles are within a slice, so each one is derived on its own.
+    if slices is not None and table_exists(con, target):
+        frames = [derive(read_slice(con, table, season, game_type), table) for season, game_type in slices]
+        # A metric added to (or dropped from) REGISTRY has to reach every
+        # slice, not just the ones this ingest touched.
+        if not frames or set(frames[0].columns) == set(table_columns(con, target)):
+            return replace_slices(con, target, frames, slices)
+
+    frames = (
+        derive(read_slice(con, table, season, game_type), table) for season, game_type in slice_keys(con, table)
+    )
+    return replace_table(con, target, frames, [
+        ("key", KEY_COLUMNS[table], True),
+        ("lookup", ["season", "game_type", NAME_COLUMNS[table]], False),
+    ])
+
+
+if __name__ == "__main__":
+    con = connect()
+    for table in sys.argv[1:] or list(ENTITIES):
+        print(f"{derived_table(table)}: {materialize(con, table)} rows")
+    con.close()
@@ -0,0 +1,86 @@
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True)
+class Entity:
+    """
+    Everything the code needs to know about one kind of row (players, teams,
+    ...): its table's key, name and metric columns, where ingest fetches it and
+    how the dashboard shows it. Indexes, per-game columns, stores, ingest,
+    stats lookups, leaderboards, figures and the Explore tab are all built
+    from this, so a new entity type is a new descriptor in ENTITIES.
+    """
+
+    table: str
+    key: tuple                # id column, season, game_type: one row per entity per slice
+    name_col: str
+    endpoint: str             # nba_api stats endpoint class that serves one slice
+    noun: str                 # "player" -> "Search & select a player…"
+    plural: str
+    label: str                # axis title for the name column
+    metrics: dict             # Overview metric -> leaderboard label, in card order
+    card_labels: list         # headings of the Overview metric cards
+    per_game: dict = field(default_factory=dict)       # per-game column -> counting stat, stored on the table
+    categorical: tuple = ()   # text columns besides season/game_type/name the store keeps as codes
+    column_labels: dict = field(default_factory=dict)  # Explore titles for the entity's own columns
+    card_format: str = "{:.1f}"
+    delta_format: str = "{:+.1f}"
+    texttemplate: str = "%{x:.1f}"
+    alias_col: str = None     # extra searchable spelling, e.g. NICKNAME
+    profile: tuple = ()       # stats compared by the "similar" panel; counts go per game
+
+
+PLAYERS = Entity(
+    table="players",
+    key=("PLAYER_ID", "season", "game_type"),
+    name_col="PLAYER_NAME",
+    endpoint="LeagueDashPlayerStats",
+    noun="player",
+    plural="players",
+    label="Player",
+    metrics={"PPG": "PPG", "APG": "APG", "RPG": "RPG", "SPG": "SPG", "BPG": "BPG", "TOPG": "TOPG"},
+    card_labels=["PPG", "APG", "RPG", "SPG", "BPG", "TOPG"],
+    per_game={"PPG": "PTS", "APG": "AST", "RPG": "REB", "SPG": "STL", "BPG": "BLK", "TOPG": "TOV"},
+    categorical=("TEAM_ABBREVIATION",),
+    column_labels={
+        "PLAYER_ID":         "Player ID",
+        "PLAYER_NAME":       "Player Name",
+        "NICKNAME":          "Nickname",
+        "TEAM_ID":           "Team ID",
+        "TEAM_ABBREVIATION": "Team Abbreviation",
+    },
+    alias_col="NICKNAME",
+    profile=("PPG", "APG", "RPG", "SPG", "BPG", "TOPG", "MIN", "FGA", "FG3A", "FTA",
+             "OREB", "PF", "FG_PCT", "FG3_PCT", "FT_PCT"),
+)
+
+TEAMS = Entity(
+    table="teams",
+    key=("TEAM_ID", "season", "game_type"),
+    name_col="TEAM_NAME",
+    endpoint="LeagueDashTeamStats",
+    noun="team",
+    plural="teams",
+    label="Team",
+    metrics={
+        "W": "Wins",
+        "L": "Losses",
+        "W_PCT": "Win %",
+        "PPG": "Points per game",
+        "FG_PCT": " FG %",
+        "FG3_PCT": "3PT %",
+    },
+    card_labels=["Wins", "Losses", "Win %", "PPG", "FG %", "3PT %"],
+    per_game={"PPG": "PTS"},
+    column_labels={
+        "TEAM_ID":   "Team ID",
+        "TEAM_NAME": "Team Name",
+    },
+    card_format="{}",
+    delta_format="{:+.2f}",
+    texttemplate=None,
+    profile=("PPG", "W_PCT", "FGA", "FG3A", "FTA", "OREB", "DREB", "AST", "TOV",
+             "STL", "BLK", "FG_PCT", "FG3_PCT", "FT_PCT", "PLUS_MINUS"),
+)
+
+ENTITIES = {entity.table: entity for entity in (PLAYERS, TEAMS)}
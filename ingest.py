@@ -0,0 +1,370 @@
+import argparse
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from functools import partial
+
+import pandas as pd
+
+from db import connect
+from derived import add_per_game, materialize as materialize_derived
+from entities import ENTITIES
+from ranks import materialize as materialize_ranks
+from schema import (KEY_COLUMNS, add_missing_columns, create_indexes, bump_data_version, drop_shadows,
+                    get_data_version, record_data_version, table_columns, table_exists)
+from snapshot import available as snapshots_available, write_snapshot
+
+SEASONS = ["2020-21", "2021-22", "2022-23", "2023-24", "2024-25"]
+GAME_TYPES = ["Regular Season", "Playoffs"]
+
+MAX_WORKERS = 4
+REQUESTS_PER_SECOND = 1.0
+BURST = 2
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+REQUEST_TIMEOUT = 30
+
+
+# table -> (nba_api endpoint class name, per-slice transform)
+DATASETS = {
+    table: (entity.endpoint, partial(add_per_game, table=table)) for table, entity in ENTITIES.items()
+}
+
+
+def default_endpoints() -> dict:
+    from nba_api.stats import endpoints
+    return {table: getattr(endpoints, name) for table, (name, _) in DATASETS.items()}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: allows `burst` requests at once, refilling at
+    `rate` tokens per second. `acquire` blocks until a token is available.
+    """
+
+    def __init__(self, rate: float = REQUESTS_PER_SECOND, burst: int = BURST):
+        self.rate = rate
+        self.capacity = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP) -> float:
+    """
+    Exponential backoff with full jitter for the given (1-based) failed attempt.
+    """
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+@dataclass
+class SliceResult:
+    table: str
+    season: str
+    game_type: str
+    df: pd.DataFrame = None
+    attempts: int = 0
+    errors: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.df is not None
+
+
+def fetch_slice(endpoint, table, season, game_type, limiter, max_attempts=MAX_ATTEMPTS, sleep=time.sleep):
+    result = SliceResult(table, season, game_type)
+    start = time.monotonic()
+    _, transform = DATASETS[table]
+
+    while result.attempts < max_attempts:
+        result.attempts += 1
+        limiter.acquire()
+        try:
+            df = endpoint(
+                season=season,
+                season_type_all_star=game_type,
+                timeout=REQUEST_TIMEOUT
+            ).get_data_frames()[0]
+        except Exception as e:
+            result.errors.append(f"{type(e).__name__}: {e}")
+            if result.attempts < max_attempts:
+                sleep(backoff_delay(result.attempts))
+            continue
+
+        df['season'] = season
+        df['game_type'] = game_type
+        if transform is not None:
+            df = transform(df)
+        result.df = df
+        break
+
+    result.elapsed = time.monotonic() - start
+    return result
+
+
+def fetch_all(tables, seasons=SEASONS, game_types=GAME_TYPES, endpoints=None,
+              max_workers=MAX_WORKERS, limiter=None, max_attempts=MAX_ATTEMPTS, on_result=None):
+    """
+    Fetches every (table, season, game_type) slice concurrently through a
+    bounded thread pool sharing one rate limiter. `on_result` is called in the
+    calling thread as each slice completes; the returned list keeps input order.
+    """
+    endpoints = endpoints or default_endpoints()
+    limiter = limiter or TokenBucket()
+    jobs = [(table, season, game_type)
+            for table in tables
+            for season in seasons
+            for game_type in game_types]
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        for job in jobs:
+            table, season, game_type = job
+            future = pool.submit(fetch_slice, endpoints[table], table, season, game_type, limiter, max_attempts)
+            futures[future] = job
+
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            if result.ok:
+                print(f"Fetched {len(result.df)} {result.table} for {result.season} ({result.game_type}) "
+                      f"in {result.attempts} attempt(s).")
+            else:
+                print(f"Failed to fetch {result.table} for {result.season} ({result.game_type}) "
+                      f"after {result.attempts} attempts: {result.errors[-1]}")
+            if on_result is not None:
+                on_result(result)
+
+    return [results[job] for job in jobs]
+
+
+def content_hash(df: pd.DataFrame) -> str:
+    digest = hashlib.sha1("|".join(map(str, df.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def ensure_slice_log(con):
+    with con:
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ingest_slices (
+                table_name   TEXT NOT NULL,
+                season       TEXT NOT NULL,
+                game_type    TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                rows         INTEGER NOT NULL,
+                loaded_at    TEXT NOT NULL,
+                PRIMARY KEY (table_name, season, game_type)
+            )
+            """
+        )
+
+
+def ensure_columns(con, target: str, df: pd.DataFrame):
+    """
+    Creates `target` from the slice's columns on first load and adds any column
+    the API has started returning since.
+    """
+    if not table_exists(con, target):
+        df.head(0).to_sql(target, con, index=False)
+        return
+    with con:
+        add_missing_columns(con, target, df)
+
+
+def ensure_table(con, table: str, df: pd.DataFrame):
+    """
+    Prepares the live table for upserts, which need the unique key index.
+    """
+    ensure_columns(con, table, df)
+    create_indexes(con, table)
+
+
+def record_slice_hash(con, table: str, season: str, game_type: str, digest: str, rows: int):
+    con.execute(
+        """
+        INSERT INTO ingest_slices (table_name, season, game_type, content_hash, rows, loaded_at)
+        VALUES (?, ?, ?, ?, ?, datetime('now'))
+        ON CONFLICT(table_name, season, game_type) DO UPDATE
+           SET content_hash = excluded.content_hash,
+               rows         = excluded.rows,
+               loaded_at    = excluded.loaded_at
+        """,
+        (table, season, game_type, digest, rows)
+    )
+
+
+def upsert_slice(con, result: SliceResult) -> bool:
+    """
+    Writes one slice in a single transaction: rows are upserted on the table's
+    key, rows that vanished from the slice are deleted, and the content hash is
+    recorded. Returns False without writing when the hash is unchanged.
+    """
+    table, df = result.table, result.df
+    digest = content_hash(df)
+
+    row = con.execute(
+        "SELECT content_hash FROM ingest_slices WHERE table_name = ? AND season = ? AND game_type = ?",
+        (table, result.season, result.game_type)
+    ).fetchone()
+    if row is not None and row[0] == digest:
+        return False
+
+    key = KEY_COLUMNS[table]
+    cols = list(df.columns)
+    col_sql = ", ".join(f'"{c}"' for c in cols)
+    placeholders = ", ".join("?" for _ in cols)
+    updates = ", ".join(f'"{c}" = excluded."{c}"' for c in cols if c not in key)
+    key_sql = ", ".join(f'"{c}"' for c in key)
+
+    values = df.astype(object).where(df.notna(), None)
+    ids = [v for v in values[key[0]].tolist() if v is not None]
+
+    with con:
+        con.executemany(
+            f'INSERT INTO "{table}" ({col_sql}) VALUES ({placeholders}) '
+            f'ON CONFLICT({key_sql}) DO UPDATE SET {updates}',
+            values.itertuples(index=False, name=None)
+        )
+        con.execute(
+            f'DELETE FROM "{table}" WHERE season = ? AND game_type = ? '
+            f'AND "{key[0]}" NOT IN (SELECT value FROM json_each(?))',
+            (result.season, result.game_type, json.dumps(ids))
+        )
+        record_slice_hash(con, table, result.season, result.game_type, digest, len(df))
+    return True
+
+
+def swap_in(con, table: str, shadow: str, hashes: dict):
+    """
+    Replaces `table` with the fully loaded and indexed `shadow` in a single
+    transaction. WAL readers keep their snapshot until they finish, and the new
+    data_version tells the dashboard to reload without a restart.
+    """
+    try:
+        create_indexes(con, table, target=shadow)
+    except Exception:
+        drop_shadows(con, table)
+        raise
+    with con:
+        con.execute("BEGIN IMMEDIATE")
+        con.execute(f'DROP TABLE IF EXISTS "{table}"')
+        con.execute(f'ALTER TABLE "{shadow}" RENAME TO "{table}"')
+        con.execute("DELETE FROM ingest_slices WHERE table_name = ?", (table,))
+        for (season, game_type), (digest, rows) in hashes.items():
+            record_slice_hash(con, table, season, game_type, digest, rows)
+        record_data_version(con, table)
+
+
+def run_ingest(tables, full: bool = False, **kwargs) -> list:
+    """
+    Fetches `tables` and writes each slice as soon as it arrives.
+
+    By default slices are upserted into the live tables and a failed slice
+    keeps its previously loaded rows. With `full=True` every slice goes into a
+    shadow table that is indexed and swapped in atomically, and only if all of
+    the table's slices were fetched. Failures are returned so callers can exit
+    non-zero instead of leaving silent gaps.
+    """
+    con = connect()
+    ensure_slice_log(con)
+    ready = set()
+    changed = {table: 0 for table in tables}
+    changed_slices = {table: [] for table in tables}
+    shadows = {}
+    hashes = {table: {} for table in tables}
+
+    if full:
+        for table in tables:
+            drop_shadows(con, table)
+            shadows[table] = f"{table}__v{get_data_version(con, table) + 1}"
+
+    def upsert(result):
+        if result.table not in ready or set(result.df.columns) - set(table_columns(con, result.table)):
+            ensure_table(con, result.table, result.df)
+            ready.add(result.table)
+        if upsert_slice(con, result):
+            changed[result.table] += len(result.df)
+            changed_slices[result.table].append((result.season, result.game_type))
+        else:
+            print(f"Unchanged {result.table} for {result.season} ({result.game_type}), skipped.")
+
+    def append_to_shadow(result):
+        shadow = shadows[result.table]
+        ensure_columns(con, shadow, result.df)
+        result.df.to_sql(shadow, con, if_exists='append', index=False)
+        hashes[result.table][(result.season, result.game_type)] = (content_hash(result.df), len(result.df))
+        changed[result.table] += len(result.df)
+
+    def load(result):
+        if result.ok:
+            (append_to_shadow if full else upsert)(result)
+            # Written: keep just the header, so a long run never holds every
+            # slice in memory at once.
+            result.df = result.df.head(0)
+
+    try:
+        results = fetch_all(tables, on_result=load, **kwargs)
+        for table, rows in changed.items():
+            if full:
+                if any(not r.ok for r in results if r.table == table):
+                    drop_shadows(con, table)
+                    print(f"Skipping swap of {table}: some slices failed.")
+                    continue
+                swap_in(con, table, shadows[table], hashes[table])
+                print(f"✅ Swapped in {rows} rows for {table}.")
+            else:
+                if rows:
+                    create_indexes(con, table)
+                    bump_data_version(con, table)
+                print(f"✅ Upserted {rows} rows into {table}.")
+            if rows:
+                # An upsert rebuilds only the slices it changed; a full load rebuilds everything.
+                slices = None if full else changed_slices[table]
+                print(f"Materialized {materialize_derived(con, table, slices)} derived rows for {table}.")
+                print(f"Materialized {materialize_ranks(con, table, slices)} rank rows for {table}.")
+                if snapshots_available():
+                    print(f"Wrote a {write_snapshot(con, table)}-row Arrow snapshot of {table}.")
+    finally:
+        con.close()
+
+    failed = [r for r in results if not r.ok]
+    attempts = sum(r.attempts for r in results)
+    print(f"{len(results) - len(failed)}/{len(results)} slices fetched with {attempts} requests.")
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch NBA stats into nba.db.")
+    parser.add_argument("tables", nargs="*", choices=list(DATASETS),
+                        help="tables to refresh (default: all)")
+    parser.add_argument("--season", action="append", dest="seasons",
+                        help="season to refresh, e.g. 2024-25 (repeatable; default: all)")
+    parser.add_argument("--full", action="store_true",
+                        help="rebuild the tables in a shadow copy and swap it in atomically")
+    args = parser.parse_args()
+    if args.full and args.seasons:
+        parser.error("--full rebuilds every season; it cannot be combined with --season")
+    failed = run_ingest(args.tables or list(DATASETS), full=args.full, seasons=args.seasons or SEASONS)
+    sys.exit(1 if failed else 0)
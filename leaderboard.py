@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+from cache import data_version, read_sql_cached
+from ranks import ranks_table
+
+
+def load_slice(table: str, name_col: str, metrics: list, season: str, game_type: str):
+    """
+    Loads the name column and every requested metric for one season/game_type
+    slice in a single (cached) query.
+    """
+    columns = ", ".join([name_col] + list(dict.fromkeys(metrics)))
+    return read_sql_cached(
+        table, season, game_type, f"leaderboard:{columns}",
+        f"""
+        SELECT {columns}
+          FROM {table}
+         WHERE season    = :season
+           AND game_type = :game_type
+        """,
+        params={"season": season, "game_type": game_type}
+    )
+
+
+def build_leaderboards(slice_df: pd.DataFrame, name_col: str, metrics: list, name: str, top_n: int = 10):
+    """
+    Returns {metric: DataFrame} with the top `top_n` rows for each metric plus the
+    selected entity, sorted ascending for horizontal bar charts.
+
+    All metrics are ranked together with one column-wise argsort over the slice,
+    so the cost does not grow with extra queries per metric.
+    """
+    names = slice_df[name_col].to_numpy()
+    matches = np.flatnonzero(names == name)
+    if matches.size == 0:
+        raise ValueError(f"No stats for {name} in this season/game_type")
+    selected = matches[0]
+
+    values = slice_df[metrics].to_numpy(dtype=float)
+    # Descending with NULLs last, like SQLite's `ORDER BY metric DESC`.
+    order = np.argsort(-values, axis=0, kind="stable")[:top_n]
+
+    boards = {}
+    for j, metric in enumerate(metrics):
+        rows = order[:, j]
+        if selected not in rows:
+            rows = np.append(rows, selected)
+
+        distinct = np.unique(values[:, j][~np.isnan(values[:, j])])
+        board = pd.DataFrame({
+            name_col: names[rows],
+            metric:   values[rows, j],
+            "rank":   len(distinct) - np.searchsorted(distinct, values[rows, j], side="left"),
+        })
+        boards[metric] = _finish_board(board, name_col, metric, name)
+
+    return boards
+
+
+def _finish_board(board: pd.DataFrame, name_col: str, metric: str, name: str) -> pd.DataFrame:
+    board = board.drop_duplicates(subset=name_col, keep="first")
+    board["active"] = board[name_col] == name
+    board = board.sort_values(metric, ascending=True).reset_index(drop=True)
+    board["color"] = board["active"].map({True: "crimson", False: "lightgray"})
+    return board
+
+
+def load_ranked_boards(table: str, name_col: str, metrics: list, season: str, game_type: str,
+                       name: str, top_n: int = 10):
+    """
+    Same result as `build_leaderboards`, read from the precomputed
+    `<table>_ranks` table in one query made of two index range scans: the top
+    ranks per metric, and the entity's own rows.
+    """
+    params = {f"m{i}": metric for i, metric in enumerate(metrics)}
+    metric_sql = ", ".join(f":{key}" for key in params)
+    params.update({"season": season, "game_type": game_type, "name": name, "top_n": top_n})
+
+    ranked = read_sql_cached(
+        ranks_table(table), season, game_type, f"ranked:{name}:{top_n}:{','.join(metrics)}",
+        f"""
+        SELECT metric, rank, {name_col}, value
+          FROM {ranks_table(table)}
+         WHERE season    = :season
+           AND game_type = :game_type
+           AND metric IN ({metric_sql})
+           AND rank     <= :top_n
+        UNION ALL
+        SELECT metric, rank, {name_col}, value
+          FROM {ranks_table(table)}
+         WHERE season    = :season
+           AND game_type = :game_type
+           AND {name_col} = :name
+           AND metric IN ({metric_sql})
+        """,
+        params=params
+    )
+    if not (ranked[name_col] == name).any():
+        raise ValueError(f"No stats for {name} in season={season}, game_type={game_type}")
+
+    boards = {}
+    for metric in metrics:
+        rows = ranked[ranked["metric"] == metric].sort_values(["rank", name_col], kind="stable")
+        # An entity inside the top N comes back from both arms of the UNION.
+        rows = rows.drop_duplicates(subset=name_col)
+        board = pd.concat([rows.head(top_n), rows[rows[name_col] == name].head(1)])
+        board = board.rename(columns={"value": metric})[[name_col, metric, "rank"]]
+        boards[metric] = _finish_board(board, name_col, metric, name)
+    return boards
+
+
+def get_leaderboards(table: str, name_col: str, metrics: list, season: str, game_type: str,
+                     name: str, top_n: int = 10, load=None):
+    """
+    Leaderboards from the rank table when it has been built, otherwise ranked
+    in memory from the slice returned by `load` (default: `load_slice`).
+    """
+    if data_version(ranks_table(table)):
+        return load_ranked_boards(table, name_col, metrics, season, game_type, name, top_n)
+
+    slice_df = load() if load else load_slice(table, name_col, metrics, season, game_type)
+    if not (slice_df[name_col] == name).any():
+        raise ValueError(f"No stats for {name} in season={season}, game_type={game_type}")
+    return build_leaderboards(slice_df, name_col, metrics, name, top_n)
@@ -1,312 +1,126 @@
+import numpy as np
 import pandas as pd
-import sqlite3 as sql
-from sqlalchemy import create_engine
-import streamlit as st
-import plotly.express as px
 
-engine = create_engine("sqlite:///nba.db")
+from charts import bar_figure, leaderboard_figs
+from derived import PERCENTILE_SUFFIX
+from entities import PLAYERS, TEAMS
+from leaderboard import get_leaderboards
+from profiling import span
+from store import get_store
 
-def get_player_stats(name: str, season: int, game_type: str):
 
-    query = """
-        SELECT
-            PPG,
-            APG,
-            RPG,
-            SPG,
-            BPG,
-            TOPG
-        FROM players
-        WHERE PLAYER_NAME = :name
-          AND season      = :season
-          AND game_type   = :game_type
-        LIMIT 1
+def get_stats(entity, name: str, season: str, game_type: str):
     """
+    The Overview metric values for one player/team, from the in-memory store.
+    """
+    stats = get_store(entity).values(name, season, game_type, list(entity.metrics))
 
-    df = pd.read_sql(
-        query,
-        con=engine,
-        params={
-            "name":      name,
-            "season":    season,
-            "game_type": game_type
-        }
-    )
-
-    if df.empty:
+    if stats is None:
         raise ValueError(f"No stats for {name} in season={season}, game_type={game_type}")
 
-    row = df.iloc[0]
-    return (
-        row["PPG"],
-        row["APG"],
-        row["RPG"],
-        row["SPG"],
-        row["BPG"],
-        row["TOPG"]
-    )
+    return stats
 
-def player_overview(name: str, season: int, game_type: str):
-    query = """
-            SELECT * FROM players WHERE 
-            season      = :season
-            AND game_type  = :game_type
-             order by PPG DESC
-             LIMIT 10
-             """
-    df = pd.read_sql(query, con=engine, params={"season": season, "game_type": game_type})
 
-    query_player = """
-    SELECT * FROM players
-    WHERE season  = :season
-    AND game_type  = :game_type
-    AND PLAYER_NAME = :name
+def overview(entity, name: str, season: str, game_type: str, metric: str, top_n: int = 10):
     """
-
-    df2 = pd.read_sql(query_player, con=engine, params={"name": name, "season": season, "game_type": game_type})
-
-    df_combined = pd.concat([df, df2], ignore_index=True)
-    df_unique = df_combined.drop_duplicates(subset="PLAYER_NAME", keep="first")
-
-    df_unique["active"] = df_unique["PLAYER_NAME"] == name
-    df_unique["color"] = df_unique["active"].map({True: "crimson", False: "lightgray"})
-    df_unique = df_unique.sort_values(by=["PPG"], ascending=True)
-
-    fig = px.bar(
-        df_unique,
-        x = "PPG",
-        y = "PLAYER_NAME",
-        orientation = "h",
-        text = "PPG",
-        template="plotly_dark",
-        labels={"PLAYER_NAME": "Player", "PPG": "PPG", "active": ""}
-    )
-    fig.update_layout(showlegend=False)
-    fig.update_traces(
-        marker_color=df_unique["color"],
-        texttemplate="%{x:.1f}",
-        textposition="outside"
-    )
-
-    return fig
-
-def player_overview_apg(name: str, season: int, game_type: str):
-    query = """
-            SELECT * FROM players WHERE 
-            season      = :season
-            AND game_type  = :game_type
-             order by APG DESC
-             LIMIT 10
-             """
-    df = pd.read_sql(query, con=engine, params={"season": season, "game_type": game_type})
-
-    query_player = """
-    SELECT * FROM players
-    WHERE season  = :season
-    AND game_type  = :game_type
-    AND PLAYER_NAME = :name
+    One untitled leaderboard bar chart: the top `top_n` by `metric` plus `name`.
     """
-
-    df2 = pd.read_sql(query_player, con=engine, params={"name": name, "season": season, "game_type": game_type})
-
-    df_combined = pd.concat([df, df2], ignore_index=True)
-    df_unique = df_combined.drop_duplicates(subset="PLAYER_NAME", keep="first")
-
-    df_unique["active"] = df_unique["PLAYER_NAME"] == name
-    df_unique["color"] = df_unique["active"].map({True: "crimson", False: "lightgray"})
-    df_unique = df_unique.sort_values(by=["APG"], ascending=True)
-
-    fig = px.bar(
-        df_unique,
-        x = "APG",
-        y = "PLAYER_NAME",
-        orientation = "h",
-        text = "APG",
-        template="plotly_dark",
-        labels={"PLAYER_NAME": "Player", "APG": "APG", "active": ""}
-    )
-    fig.update_layout(showlegend=False)
-    fig.update_traces(
-        marker_color=df_unique["color"],
-        texttemplate="%{x:.1f}",
-        textposition="outside"
-    )
-
-    return fig
+    with span("leaderboard", f"{entity.table} {metric}"):
+        boards = get_leaderboards(
+            entity.table, entity.name_col, [metric], season, game_type, name, top_n,
+            load=lambda: get_store(entity).frame(season, game_type, [entity.name_col, metric])
+        )
+    with span("figure", f"overview {entity.table}.{metric}"):
+        return bar_figure(boards[metric], metric, entity.name_col, metric, entity.label,
+                          texttemplate=entity.texttemplate)
 
 
-def get_player_metric_figs(name: str, season: str, game_type: str, top_n: int = 10):
+def get_metric_figs(entity, name: str, season: str, game_type: str, top_n: int = 10):
     """
-    Returns a list of (metric_name, fig) for the six hard-coded metrics.
+    Returns a list of (metric_name, fig) for the entity's Overview metrics.
+    Boards come from the precomputed rank table in one query (or, before it is
+    built, from the in-memory store ranked in one pass), and each figure is
+    memoized per (season, game_type, metric, entity).
     """
-    metrics = ["PPG", "APG", "RPG", "SPG", "BPG", "TOPG"]
-    figs = []
-
-    for metric in metrics:
-        top_df = pd.read_sql(
-            f"""
-            SELECT PLAYER_NAME, {metric}
-              FROM players
-             WHERE season    = :season
-               AND game_type = :game_type
-             ORDER BY {metric} DESC
-             LIMIT {top_n}
-            """,
-            engine,
-            params={"season": season, "game_type": game_type}
-        )
-
-        stats = get_player_stats(name, season, game_type)
-        stat_map = dict(zip(metrics, stats))
-        player_val = stat_map[metric]
-        player_row = pd.DataFrame({"PLAYER_NAME": [name], metric: [player_val]})
-
-        df = pd.concat([top_df, player_row], ignore_index=True)
-        df = df.drop_duplicates(subset="PLAYER_NAME", keep="first")
-        df["active"] = df["PLAYER_NAME"] == name
-        df = df.sort_values(metric, ascending=True).reset_index(drop=True)
-        df["color"] = df["active"].map({True: "crimson", False: "lightgray"})
-
-        NAMES = {
-            "PPG": "PPG",
-            "APG": "APG",
-            "RPG": "RPG",
-            "SPG": "SPG",
-            "BPG": "BPG",
-            "TOPG": "TOPG"
-        }
-
-        names = NAMES.get(metric, metric)
-        fig = px.bar(
-            df,
-            x=metric,
-            y="PLAYER_NAME",
-            orientation="h",
-            text=metric,
-            template="plotly_dark",
-            labels={"PLAYER_NAME": "Player", metric: names},
-            title= f"Top 10 players by {names}"
-        )
-        fig.update_traces(
-            marker_color=df["color"],
-            texttemplate="%{x:.1f}",
-            textposition="outside"
-        )
-        fig.update_layout(
-            showlegend=False,
+    metrics = list(entity.metrics)
+
+    def build(df, metric):
+        names = entity.metrics[metric]
+        rank = df.loc[df["active"], "rank"]
+        rank_str = f"<br><sup>{name}: #{int(rank.iloc[0])} in the league</sup>" if len(rank) else ""
+        return bar_figure(
+            df, metric, entity.name_col, names, entity.label,
+            title=f"Top 10 {entity.plural} by {names}{rank_str}",
+            texttemplate=entity.texttemplate,
             bargap=0.15,
             margin=dict(l=50, r=50, t=70, b=20),
-            width = 900,
-            height = 400
+            width=900,
+            height=400
         )
 
-        figs.append((metric, fig))
-
-    return figs
-
-
-def get_team_stats(name: str, season: str, game_type: str):
-    query = """
-        SELECT
-            W,
-            L,
-            FG_PCT,
-            FG3_PCT,
-            PPG,
-            W_PCT
-        FROM teams
-        WHERE TEAM_NAME = :name
-          AND season      = :season
-          AND game_type   = :game_type
-        LIMIT 1
-    """
-    df = pd.read_sql(
-        query,
-        con=engine,
-        params={
-            "name":      name,
-            "season":    season,
-            "game_type": game_type
-        }
+    return leaderboard_figs(
+        entity.table, entity.name_col, metrics, name, season, game_type, top_n,
+        load=lambda: get_store(entity).frame(season, game_type, [entity.name_col] + metrics),
+        build=build
     )
-    if df.empty:
-        raise ValueError(f"No stats for {name} in season={season}, game_type={game_type}")
 
-    row = df.iloc[0]
-    return (
-        row["W"],
-        row["L"],
-        row["W_PCT"],
-        row["PPG"],
-        row["FG_PCT"],
-        row["FG3_PCT"]
-    )
 
-def get_team_metric_figs(name: str, season: str, game_type: str, top_n: int = 10):
+def compare(entity, names: list, seasons: list, game_type: str, metrics: list = None) -> pd.DataFrame:
     """
-    Returns a list of (metric_name, fig) for the six hard-coded metrics.
+    One row per (name, season), names in the order given, with each metric
+    and its league percentile that season (`<metric>_PCTL`, share of the
+    league at or below). Pairs without stats stay as NaN rows so every entity
+    lines up. All pairs come from one batched store lookup, so 20 names cost
+    about what 2 do.
     """
-    metrics = ["W", "L", "W_PCT", "PPG", "FG_PCT", "FG3_PCT"]
-    figs = []
+    metrics = metrics or list(entity.metrics)
+    store = get_store(entity)
+    rows = store.rows(names, seasons, game_type)
+    found = rows >= 0
+
+    values = np.full((len(rows), len(metrics)), np.nan)
+    values[found] = np.column_stack([store.columns[m][rows[found]].astype(float) for m in metrics])
+
+    pctl = np.full_like(values, np.nan)
+    for i, season in enumerate(seasons):
+        league = np.column_stack([store.columns[m][store.slice_range(season, game_type)].astype(float)
+                                  for m in metrics])
+        # NaN sorts last, so searchsorted only ever counts real values.
+        league.sort(axis=0)
+        counts = (~np.isnan(league)).sum(axis=0)
+        picked = np.flatnonzero(found & (np.arange(len(rows)) % len(seasons) == i))
+        for j in range(len(metrics)):
+            if counts[j]:
+                pctl[picked, j] = np.searchsorted(league[:, j], values[picked, j], side="right") / counts[j]
+
+    # Built in one go: inserting columns one by one costs more than the lookup.
+    return pd.DataFrame({
+        entity.name_col: np.repeat(np.array(names, dtype=object), len(seasons)),
+        "season": np.tile(np.array(seasons, dtype=object), len(names)),
+        **dict(zip(metrics, values.T)),
+        **{m + PERCENTILE_SUFFIX: col for m, col in zip(metrics, pctl.T)},
+    })
+
+
+def get_player_stats(name: str, season: str, game_type: str):
+    return get_stats(PLAYERS, name, season, game_type)
 
-    for metric in metrics:
-        top_df = pd.read_sql(
-            f"""
-            SELECT TEAM_NAME, {metric}
-              FROM teams
-             WHERE season    = :season
-               AND game_type = :game_type
-             ORDER BY {metric} DESC
-             LIMIT {top_n}
-            """,
-            engine,
-            params={"season": season, "game_type": game_type}
-        )
 
-        stats = get_team_stats(name, season, game_type)
-        stat_map = dict(zip(metrics, stats))
-        team_val = stat_map[metric]
-        team_row = pd.DataFrame({"TEAM_NAME": [name], metric: [team_val]})
+def get_team_stats(name: str, season: str, game_type: str):
+    return get_stats(TEAMS, name, season, game_type)
 
-        df = pd.concat([top_df, team_row], ignore_index=True)
-        df = df.drop_duplicates(subset="TEAM_NAME", keep="first")
-        df["active"] = df["TEAM_NAME"] == name
-        df = df.sort_values(metric, ascending=True).reset_index(drop=True)
-        df["color"] = df["active"].map({True: "crimson", False: "lightgray"})
 
-        NAMES = {
-            "W": "Wins",
-            "L": "Losses",
-            "W_PCT": "Win %",
-            "PPG": "Points per game",
-            "FG_PCT": " FG %",
-            "FG3_PCT": "3PT %"
-        }
+def player_overview(name: str, season: str, game_type: str):
+    return overview(PLAYERS, name, season, game_type, "PPG")
 
-        names = NAMES.get(metric, metric)
-        fig = px.bar(
-            df,
-            x=metric,
-            y="TEAM_NAME",
-            orientation="h",
-            text=metric,
-            template="plotly_dark",
-            labels={"TEAM_NAME": "Team", metric: names},
-            title=f"Top 10 teams by {names}"
-        )
-        fig.update_traces(
-            marker_color=df["color"],
-            textposition="outside"
-        )
-        fig.update_layout(
-            showlegend=False,
-            bargap=0.15,
-            margin=dict(l=50, r=50, t=70, b=20),
-            width = 900,
-            height = 400
-        )
 
-        figs.append((metric, fig))
+def player_overview_apg(name: str, season: str, game_type: str):
+    return overview(PLAYERS, name, season, game_type, "APG")
+
+
+def get_player_metric_figs(name: str, season: str, game_type: str, top_n: int = 10):
+    return get_metric_figs(PLAYERS, name, season, game_type, top_n)
 
-    return figs
 
+def get_team_metric_figs(name: str, season: str, game_type: str, top_n: int = 10):
+    return get_metric_figs(TEAMS, name, season, game_type, top_n)
@@ -0,0 +1,49 @@
+from functools import cached_property
+
+from metrics import get_metric_figs, get_stats
+
+
+def prev_season(season: str) -> str:
+
+    start_year = int(season.split("-")[0])
+    prev_start = start_year - 1
+    prev_end = start_year
+    return f"{prev_start}-{str(prev_end)[-2:]}"
+
+
+class PagePlan:
+    """
+    Everything one player/team page shows, fetched once per rerun and shared
+    by its tabs.
+
+    Stats for the selected and previous season are two lookups in the same
+    in-memory store (no SQL unless the data version changed), and the
+    leaderboards are a single rank-table query, only run when the Overview
+    actually asks for them.
+    """
+
+    def __init__(self, entity, name: str, season: str, game_type: str, top_n: int = 10):
+        self.entity = entity
+        self.name = name
+        self.season = season
+        self.game_type = game_type
+        self.top_n = top_n
+
+    @cached_property
+    def current(self) -> tuple:
+        return get_stats(self.entity, self.name, self.season, self.game_type)
+
+    @cached_property
+    def previous(self) -> tuple:
+        try:
+            return get_stats(self.entity, self.name, prev_season(self.season), self.game_type)
+        except ValueError:
+            return (None,) * len(self.current)
+
+    @cached_property
+    def deltas(self) -> list:
+        return [None if p is None else c - p for c, p in zip(self.current, self.previous)]
+
+    @cached_property
+    def metric_figs(self) -> list:
+        return get_metric_figs(self.entity, self.name, self.season, self.game_type, top_n=self.top_n)
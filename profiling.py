@@ -0,0 +1,95 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Append one JSON line per rerun here when set.
+LOG_PATH = os.environ.get("NBA_PROFILE_LOG")
+# Durations kept per span kind for the cross-session percentiles.
+WINDOW = 2000
+
+# Spans recorded by the current rerun; Streamlit runs each rerun on its own
+# thread, like the query counter in db.py.
+_local = threading.local()
+_samples = {}
+_samples_lock = threading.Lock()
+_log_lock = threading.Lock()
+
+
+def start_rerun():
+    _local.spans = []
+    _local.started = time.perf_counter()
+
+
+@contextmanager
+def span(kind: str, label: str, **fields):
+    """
+    Times the block as one `kind` ("sql", "leaderboard", "figure", "render")
+    span. The yielded dict can be filled in, e.g. `rec["rows"] = len(df)`.
+    """
+    record = {"kind": kind, "label": label, **fields}
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["ms"] = (time.perf_counter() - start) * 1000
+        _record(record)
+
+
+def _record(record: dict):
+    spans = getattr(_local, "spans", None)
+    if spans is not None:
+        spans.append(record)
+    with _samples_lock:
+        _samples.setdefault(record["kind"], deque(maxlen=WINDOW)).append(record["ms"])
+
+
+def rerun_spans() -> list:
+    return list(getattr(_local, "spans", []))
+
+
+def finish_rerun(page: str) -> dict:
+    """
+    Closes the rerun: records its wall time, writes the JSON line and returns
+    {"page", "ms", "totals": {kind: {"count", "ms"}}, "spans"}.
+    """
+    started = getattr(_local, "started", None)
+    spans = rerun_spans()
+    total_ms = (time.perf_counter() - started) * 1000 if started is not None else 0.0
+
+    totals = {}
+    for record in spans:
+        entry = totals.setdefault(record["kind"], {"count": 0, "ms": 0.0})
+        entry["count"] += 1
+        entry["ms"] += record["ms"]
+
+    with _samples_lock:
+        _samples.setdefault("rerun", deque(maxlen=WINDOW)).append(total_ms)
+
+    summary = {"page": page, "ms": total_ms, "totals": totals, "spans": spans}
+    if LOG_PATH:
+        line = json.dumps({"ts": time.time(), **summary}, default=str)
+        with _log_lock, open(LOG_PATH, "a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+    return summary
+
+
+def percentiles() -> dict:
+    """
+    {kind: {"n", "p50", "p95", "p99"}} in milliseconds, across every session
+    served by this process.
+    """
+    with _samples_lock:
+        samples = {kind: np.fromiter(values, dtype=float) for kind, values in _samples.items()}
+
+    out = {}
+    for kind, values in samples.items():
+        if not len(values):
+            continue
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        out[kind] = {"n": len(values), "p50": p50, "p95": p95, "p99": p99}
+    return out
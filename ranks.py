@@ -0,0 +1,109 @@
+import sys
+
+import pandas as pd
+
+from db import connect
+from derived import PERCENTILE_SUFFIX, derived_table
+from schema import KEY_COLUMNS, NAME_COLUMNS, read_slice, replace_slices, replace_table, slice_keys, table_exists
+
+
+def ranks_table(table: str) -> str:
+    return f"{table}_ranks"
+
+
+def rankable_columns(df: pd.DataFrame, table: str) -> list:
+    """
+    Every numeric column except ids, the API's own *_RANK columns and the
+    stored percentiles.
+    """
+    skip = {KEY_COLUMNS[table][0], "TEAM_ID"}
+    return [
+        col for col in df.select_dtypes(include=["number"]).columns
+        if col not in skip
+        and not col.endswith("_RANK")
+        and not col.endswith(PERCENTILE_SUFFIX)
+    ]
+
+
+def build_ranks(df: pd.DataFrame, table: str) -> pd.DataFrame:
+    """
+    Long format (season, game_type, metric, rank, pctl, id, name, value): dense
+    rank (1 = highest value) and percentile of every rankable column within
+    each (season, game_type), computed in one grouped rank over the melted frame.
+    """
+    id_col, name_col = KEY_COLUMNS[table][0], NAME_COLUMNS[table]
+    long = df.melt(
+        id_vars=[id_col, name_col, "season", "game_type"],
+        value_vars=rankable_columns(df, table),
+        var_name="metric",
+        value_name="value",
+    ).dropna(subset=["value"])
+
+    groups = long.groupby(["season", "game_type", "metric"])["value"]
+    long["rank"] = groups.rank(method="dense", ascending=False).astype("int64")
+    long["pctl"] = groups.rank(method="max", pct=True)
+
+    return long[["season", "game_type", "metric", "rank", "pctl", id_col, name_col, "value"]]
+
+
+def slice_with_derived(con, table: str, season: str, game_type: str) -> pd.DataFrame:
+    """
+    One slice of the base table joined with its derived metrics.
+    """
+    df = read_slice(con, table, season, game_type)
+    derived = derived_table(table)
+    if table_exists(con, derived):
+        extra = read_slice(con, derived, season, game_type).drop(columns=[NAME_COLUMNS[table]])
+        df = df.merge(extra, on=KEY_COLUMNS[table], how="left", suffixes=("", "_derived"))
+    return df
+
+
+def metrics_changed(con, table: str, slices: list) -> bool:
+    """
+    Whether a slice outside `slices` is stored with other metrics than
+    `build_ranks` now gives it, i.e. the base table or the derived registry
+    gained or lost a column since the rank table was built.
+    """
+    changed = set(slices)
+    untouched = [key for key in slice_keys(con, table) if key not in changed]
+    if not untouched:
+        return False
+    season, game_type = untouched[-1]
+    stored = {metric for (metric,) in con.execute(
+        f'SELECT DISTINCT metric FROM "{ranks_table(table)}" WHERE season = ? AND game_type = ?',
+        (season, game_type)
+    )}
+    return stored != set(build_ranks(slice_with_derived(con, table, season, game_type), table)["metric"])
+
+
+def materialize(con, table: str, slices: list = None) -> int:
+    """
+    Rebuilds `<table>_ranks`, one (season, game_type) slice at a time. With
+    `slices` only those slices' rows are replaced; otherwise, or when the set
+    of metrics has changed, the whole table is rebuilt in a shadow copy.
+    Indexed so both "top N for metric X" and "rank of entity P" are index
+    range scans.
+    """
+    if not table_exists(con, table):
+        return 0
+
+    target = ranks_table(table)
+    full = slices is None or not table_exists(con, target) or metrics_changed(con, table, slices)
+    if full:
+        slices = slice_keys(con, table)
+    frames = (build_ranks(slice_with_derived(con, table, season, game_type), table) for season, game_type in slices)
+
+    if not full:
+        return replace_slices(con, target, frames, slices)
+    name_col = NAME_COLUMNS[table]
+    return replace_table(con, target, frames, [
+        ("top", ["season", "game_type", "metric", "rank", name_col, "value"], False),
+        ("entity", ["season", "game_type", "metric", name_col, "rank", "value"], False),
+    ])
+
+
+if __name__ == "__main__":
+    con = connect()
+    for table in sys.argv[1:] or list(KEY_COLUMNS):
+        print(f"{ranks_table(table)}: {materialize(con, table)} rows")
+    con.close()
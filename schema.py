@@ -0,0 +1,266 @@
+import sqlite3
+
+import pandas as pd
+
+from db import connect
+from entities import ENTITIES
+
+# Table-keyed views of the entity descriptors for the storage code.
+NAME_COLUMNS = {table: entity.name_col for table, entity in ENTITIES.items()}
+
+# One row per entity per slice; ingest upserts on this key.
+KEY_COLUMNS = {table: list(entity.key) for table, entity in ENTITIES.items()}
+
+
+def table_exists(con: sqlite3.Connection, table: str) -> bool:
+    row = con.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()
+    return row is not None
+
+
+def table_columns(con: sqlite3.Connection, table: str) -> list:
+    return [row[1] for row in con.execute(f'PRAGMA table_info("{table}")')]
+
+
+def column_type(dtype) -> str:
+    """
+    The declared SQLite type `DataFrame.to_sql` would give a column of
+    `dtype`, so columns added later look like the ones created with the table.
+    """
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "TIMESTAMP"
+    return "TEXT"
+
+
+def add_missing_columns(con: sqlite3.Connection, target: str, df: pd.DataFrame):
+    """
+    Adds every column of `df` that `target` lacks, typed from its dtype,
+    inside the caller's transaction.
+    """
+    existing = set(table_columns(con, target))
+    for col, dtype in df.dtypes.items():
+        if col not in existing:
+            con.execute(f'ALTER TABLE "{target}" ADD COLUMN "{col}" {column_type(dtype)}')
+
+
+def existing_indexes(con: sqlite3.Connection, table: str) -> set:
+    """
+    Returns {(columns, unique)} for the indexes already on `table`, so a managed
+    index is recognised even when it was built under another name (see
+    `create_indexes(..., target=...)`).
+    """
+    found = set()
+    for _, name, unique, _, _ in con.execute(f'PRAGMA index_list("{table}")'):
+        cols = tuple(row[2] for row in con.execute(f'PRAGMA index_info("{name}")'))
+        found.add((cols, bool(unique)))
+    return found
+
+
+def index_definitions(table: str, columns: list, target: str = None) -> list:
+    """
+    Returns a list of (index_name, [columns], unique) for `table`, skipping any
+    index whose columns are not all present (e.g. teams.PPG before it is computed).
+    Index names are derived from `target`, the physical table, when given.
+    """
+    target = target or table
+    present = set(columns)
+    entity = ENTITIES[table]
+    definitions = []
+
+    if all(c in present for c in entity.key):
+        definitions.append((f"ux_{target}_key", list(entity.key), True))
+
+    # Every one-row lookup filters on (season, game_type, name) and reads the
+    # entity's metrics, so stats lookups are answered from the index alone.
+    lookup = [c for c in ["season", "game_type", entity.name_col] if c in present]
+    if len(lookup) == 3:
+        covered = [c for c in entity.metrics if c in present]
+        definitions.append((f"ix_{target}_lookup", lookup + covered, False))
+
+    # The leaderboards sort on the metrics too: one (season, game_type,
+    # metric, name) index each makes `ORDER BY metric DESC LIMIT n` a reverse
+    # range scan.
+    for metric in entity.metrics:
+        cols = ["season", "game_type", metric, entity.name_col]
+        if all(c in present for c in cols):
+            definitions.append((f"ix_{target}_rank_{metric}", cols, False))
+
+    return definitions
+
+
+def create_indexes(con: sqlite3.Connection, table: str, target: str = None) -> list:
+    """
+    (Re)creates the managed indexes for logical `table` on the physical table
+    `target` (default: `table` itself) and refreshes planner statistics.
+    Safe to call after every load; indexes that already exist are left alone.
+    """
+    target = target or table
+    if not table_exists(con, target):
+        return []
+
+    definitions = index_definitions(table, table_columns(con, target), target)
+    existing = existing_indexes(con, target)
+    with con:
+        for name, cols, unique in definitions:
+            if (tuple(cols), unique) in existing:
+                continue
+            col_sql = ", ".join(f'"{c}"' for c in cols)
+            kind = "UNIQUE INDEX" if unique else "INDEX"
+            con.execute(f'CREATE {kind} IF NOT EXISTS "{name}" ON "{target}" ({col_sql})')
+        con.execute(f'ANALYZE "{target}"')
+
+    return [name for name, _, _ in definitions]
+
+
+def record_data_version(con: sqlite3.Connection, table: str):
+    """
+    Increments the stamp for `table` inside the caller's transaction.
+    """
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS data_version (
+            table_name TEXT PRIMARY KEY,
+            version    INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """
+    )
+    con.execute(
+        """
+        INSERT INTO data_version (table_name, version, updated_at)
+        VALUES (?, 1, datetime('now'))
+        ON CONFLICT(table_name) DO UPDATE
+           SET version    = version + 1,
+               updated_at = excluded.updated_at
+        """,
+        (table,)
+    )
+
+
+def bump_data_version(con: sqlite3.Connection, table: str) -> int:
+    """
+    Records that `table` was reloaded. Readers compare this stamp to decide
+    whether cached results are still valid.
+    """
+    with con:
+        record_data_version(con, table)
+    return get_data_version(con, table)
+
+
+def get_data_version(con: sqlite3.Connection, table: str) -> int:
+    try:
+        row = con.execute(
+            "SELECT version FROM data_version WHERE table_name = ?", (table,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] if row else 0
+
+
+def drop_shadows(con, table: str):
+    """
+    Removes `<table>__v<n>` shadow tables left behind by an interrupted rebuild.
+    """
+    rows = con.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ? ESCAPE '!'",
+        (f"{table}!_!_v%",)
+    ).fetchall()
+    for (name,) in rows:
+        with con:
+            con.execute(f'DROP TABLE "{name}"')
+
+
+def slice_keys(con: sqlite3.Connection, table: str) -> list:
+    return con.execute(
+        f'SELECT DISTINCT season, game_type FROM "{table}" ORDER BY season, game_type'
+    ).fetchall()
+
+
+def read_slice(con: sqlite3.Connection, table: str, season: str, game_type: str) -> pd.DataFrame:
+    return pd.read_sql(
+        f'SELECT * FROM "{table}" WHERE season = ? AND game_type = ?', con, params=(season, game_type)
+    )
+
+
+def insert_rows(con: sqlite3.Connection, target: str, df):
+    """
+    Inserts `df` into `target` inside the caller's transaction.
+    """
+    col_sql = ", ".join(f'"{c}"' for c in df.columns)
+    placeholders = ", ".join("?" for _ in df.columns)
+    values = df.astype(object).where(df.notna(), None)
+    con.executemany(
+        f'INSERT INTO "{target}" ({col_sql}) VALUES ({placeholders})',
+        values.itertuples(index=False, name=None)
+    )
+
+
+def replace_table(con: sqlite3.Connection, target: str, frames, indexes: list) -> int:
+    """
+    Writes `frames` (an iterable of DataFrames, e.g. one per slice, so only
+    one is in memory at a time) to a `<target>__v<n>` shadow, builds
+    `indexes` (a list of (suffix, [columns], unique)) on it, then swaps it in
+    and bumps the data version in one transaction. Used for tables fully
+    derived at ingest time.
+    """
+    drop_shadows(con, target)
+    shadow = f"{target}__v{get_data_version(con, target) + 1}"
+    rows = 0
+    for df in frames:
+        if not table_exists(con, shadow):
+            df.head(0).to_sql(shadow, con, index=False)
+        with con:
+            insert_rows(con, shadow, df)
+        rows += len(df)
+    if not table_exists(con, shadow):
+        return 0
+
+    with con:
+        for suffix, cols, unique in indexes:
+            col_sql = ", ".join(f'"{c}"' for c in cols)
+            kind = "UNIQUE INDEX" if unique else "INDEX"
+            con.execute(f'CREATE {kind} "{"ux" if unique else "ix"}_{shadow}_{suffix}" ON "{shadow}" ({col_sql})')
+        con.execute(f'ANALYZE "{shadow}"')
+
+    with con:
+        con.execute("BEGIN IMMEDIATE")
+        con.execute(f'DROP TABLE IF EXISTS "{target}"')
+        con.execute(f'ALTER TABLE "{shadow}" RENAME TO "{target}"')
+        record_data_version(con, target)
+
+    return rows
+
+
+def replace_slices(con: sqlite3.Connection, target: str, frames, slices: list) -> int:
+    """
+    Replaces only the rows of `slices` ((season, game_type) pairs) in
+    `target` with `frames`, and bumps its data version, in one transaction.
+    An ingest that changed one season rewrites that season and nothing else.
+    """
+    frames = list(frames)  # built before the write lock is taken
+    with con:
+        con.execute("BEGIN IMMEDIATE")
+        for df in frames:
+            add_missing_columns(con, target, df)
+        for season, game_type in slices:
+            con.execute(f'DELETE FROM "{target}" WHERE season = ? AND game_type = ?', (season, game_type))
+        for df in frames:
+            insert_rows(con, target, df)
+        record_data_version(con, target)
+    return sum(len(df) for df in frames)
+
+
+def migrate(con: sqlite3.Connection) -> dict:
+    return {table: create_indexes(con, table) for table in ENTITIES}
+
+
+if __name__ == "__main__":
+    con = connect()
+    for table, names in migrate(con).items():
+        print(f"{table}: {len(names)} indexes")
+    con.close()
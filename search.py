@@ -0,0 +1,133 @@
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from store import per_store
+
+TOP_K = 10
+# Matches sharing less than this share of the query's trigrams are dropped.
+MIN_SCORE = 0.3
+
+
+def fold(text: str) -> str:
+    """
+    Lower-cased, accent-free words: "Nikola Jokić" -> "nikola jokic".
+    """
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", text.casefold()).split())
+
+
+def trigrams(text: str, prefix: bool = False) -> set:
+    """
+    Trigrams of each word padded as "  word ", the way pg_trgm does it. With
+    `prefix` the last word is left open at the end, so a half-typed name
+    still matches in full.
+    """
+    words = fold(text).split()
+    grams = set()
+    for i, word in enumerate(words):
+        padded = f"  {word}" if prefix and i == len(words) - 1 else f"  {word} "
+        grams.update(padded[j:j + 3] for j in range(len(padded) - 2))
+    return grams
+
+
+class SearchIndex:
+    """
+    A trigram index over every name an id has carried in any season, plus its
+    nickname variant ("Steph Curry" next to "Stephen Curry"). Each id is one
+    entry; each spelling of it is one document.
+    """
+
+    def __init__(self, store, id_col: str, alias_col: str = None):
+        self.store = store
+        ids = store.columns[id_col]
+        names = store.columns[store.NAME_COL]
+
+        self.ids, self._row_entry = np.unique(ids, return_inverse=True)
+        # The most recent spelling names the entry; rows are in season order.
+        last_row = np.zeros(len(self.ids), dtype=np.int64)
+        last_row[self._row_entry] = np.arange(len(ids))
+        self.names = names[last_row]
+
+        pairs = pd.DataFrame({
+            "entry": self._row_entry,
+            "name": names,
+            "alias": store.columns[alias_col] if alias_col else None,
+        }).drop_duplicates()
+        documents = {}
+        for entry, name, alias in pairs.itertuples(index=False):
+            documents.setdefault((entry, fold(name)), None)
+            if alias:
+                surname = str(name).split(" ", 1)[1:]
+                documents.setdefault((entry, fold(" ".join([alias] + surname))), None)
+
+        postings = {}
+        self._doc_entry = np.empty(len(documents), dtype=np.int64)
+        self._doc_size = np.empty(len(documents), dtype=np.int64)
+        for doc, (entry, text) in enumerate(documents):
+            grams = trigrams(text)
+            self._doc_entry[doc] = entry
+            self._doc_size[doc] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(doc)
+        self._postings = {gram: np.array(docs, dtype=np.int64) for gram, docs in postings.items()}
+        self._slices = {}
+
+    def _slice_names(self, season: str, game_type: str) -> np.ndarray:
+        """
+        Each entry's name in one slice, None where it did not play.
+        """
+        key = (season, game_type)
+        names = self._slices.get(key)
+        if names is None:
+            rows = self.store.slice_range(season, game_type)
+            names = np.full(len(self.ids), None, dtype=object)
+            names[self._row_entry[rows]] = self.store.columns[self.store.NAME_COL][rows]
+            self._slices[key] = names
+        return names
+
+    def search(self, query: str, season: str = None, game_type: str = None, k: int = TOP_K) -> list:
+        """
+        The `k` best names for `query`, best first. Entries are ranked by the
+        share of the query's trigrams they contain, then by overall trigram
+        similarity, so "lebr" and "lebrom jams" both find LeBron James. With a
+        season and game type, only names from that slice come back.
+        """
+        grams = trigrams(query, prefix=not query.endswith(" "))
+        hits = [self._postings[g] for g in grams if g in self._postings]
+        if not hits:
+            return []
+
+        shared = np.bincount(np.concatenate(hits), minlength=len(self._doc_entry))
+        docs = np.flatnonzero(shared)
+        coverage = shared[docs] / len(grams)
+        similarity = shared[docs] / (len(grams) + self._doc_size[docs] - shared[docs])
+        score = np.full(len(self.ids), -1.0)
+        # Coverage decides, similarity breaks ties (it is always < 1).
+        np.maximum.at(score, self._doc_entry[docs], np.floor(coverage * 100) + similarity)
+
+        names = self.names
+        if season is not None:
+            names = self._slice_names(season, game_type)
+            score[np.equal(names, None)] = -1.0
+        score[score < MIN_SCORE * 100] = -1.0
+
+        candidates = np.flatnonzero(score >= 0)
+        if len(candidates) > k:
+            # Keep every tie with the k-th score so the name order, not the
+            # partition, decides which of them make the cut.
+            kth = np.partition(-score[candidates], k - 1)[k - 1]
+            candidates = candidates[-score[candidates] <= kth]
+        best = candidates[np.lexsort((names[candidates].astype(str), -score[candidates]))][:k]
+        return [names[entry] for entry in best]
+
+
+def get_index(entity) -> SearchIndex:
+    return per_store(entity, "search", lambda store: SearchIndex(store, entity.key[0], entity.alias_col))
+
+
+def search_names(entity, query: str, season: str = None, game_type: str = None, k: int = TOP_K) -> list:
+    return get_index(entity).search(query, season, game_type, k)
@@ -0,0 +1,231 @@
+import argparse
+import json
+import os
+import re
+
+import numpy as np
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from cache import ResultCache, data_version, on_reset
+from entities import ENTITIES
+from leaderboard import get_leaderboards
+from metrics import compare, get_stats
+from planner import PagePlan, prev_season
+from ranks import ranks_table
+from store import get_store, store_version
+
+try:
+    import msgpack
+except ImportError:  # optional: responses fall back to JSON
+    msgpack = None
+
+# Encoded response bodies, tagged with the ETag they were built under.
+BODY_BUDGET_BYTES = int(os.environ.get("NBA_API_CACHE_MB", "16")) * 1024 * 1024
+GZIP_MIN_BYTES = 500
+MAX_TOP_N = 100
+MAX_COMPARE = 50
+DEFAULT_GAME_TYPE = "Regular Season"
+JSON_TYPE = "application/json"
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+SEASON_PATTERN = re.compile(r"(\d{4})-(\d{2})")
+
+_bodies = ResultCache(max_bytes=BODY_BUDGET_BYTES)
+on_reset(_bodies.clear)
+
+
+def _plain(value):
+    """
+    NumPy scalars as Python values, NaN as None, so both encoders take them.
+    """
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def _metric_dict(entity, values) -> dict:
+    return {metric: _plain(value) for metric, value in zip(entity.metrics, values)}
+
+
+def stats_body(entity, name: str, season: str, game_type: str) -> dict:
+    return {
+        "name": name,
+        "season": season,
+        "game_type": game_type,
+        "stats": _metric_dict(entity, get_stats(entity, name, season, game_type)),
+    }
+
+
+def deltas_body(entity, name: str, season: str, game_type: str) -> dict:
+    page = PagePlan(entity, name, season, game_type)
+    return {
+        "name": name,
+        "season": season,
+        "game_type": game_type,
+        "previous_season": prev_season(season),
+        "current": _metric_dict(entity, page.current),
+        "previous": _metric_dict(entity, page.previous),
+        "deltas": _metric_dict(entity, page.deltas),
+    }
+
+
+def leaderboards_body(entity, name: str, season: str, game_type: str, top_n: int, metrics: list) -> dict:
+    boards = get_leaderboards(
+        entity.table, entity.name_col, metrics, season, game_type, name, top_n,
+        load=lambda: get_store(entity).frame(season, game_type, [entity.name_col] + metrics)
+    )
+    out = {}
+    for metric, board in boards.items():
+        # Boards are sorted for horizontal bars (best last); the API lists best first.
+        board = board.sort_values(["rank", entity.name_col], kind="stable")
+        out[metric] = [
+            {"name": row_name, "value": _plain(value), "rank": _plain(rank), "selected": bool(active)}
+            for row_name, value, rank, active in zip(board[entity.name_col], board[metric], board["rank"], board["active"])
+        ]
+    return {"name": name, "season": season, "game_type": game_type, "top_n": top_n, "leaderboards": out}
+
+
+def compare_body(entity, names: list, seasons: list, game_type: str) -> dict:
+    df = compare(entity, names, seasons, game_type)
+    return {
+        "game_type": game_type,
+        "rows": [{"name": row[0], "season": row[1], **{col: _plain(v) for col, v in zip(df.columns[2:], row[2:])}}
+                 for row in df.itertuples(index=False)],
+    }
+
+
+def etag(entity) -> str:
+    """
+    Changes exactly when the data behind a response can: the store's version
+    for stats and deltas, the rank table's for leaderboards.
+    """
+    return f'"{entity.table}-{store_version(entity.table)}-{data_version(ranks_table(entity.table))}"'
+
+
+def _media_type(request) -> str:
+    accept = request.headers.get("accept", "")
+    if msgpack is not None and any(t in accept for t in MSGPACK_TYPES):
+        return MSGPACK_TYPES[0]
+    return JSON_TYPE
+
+
+def _encode(body: dict, media_type: str) -> bytes:
+    if media_type == JSON_TYPE:
+        return json.dumps(body, separators=(",", ":")).encode("utf-8")
+    return msgpack.packb(body)
+
+
+def _season(value: str) -> str:
+    match = SEASON_PATTERN.fullmatch(value)
+    if match is None or (int(match[1]) + 1) % 100 != int(match[2]):
+        raise HTTPException(400, f"season must look like 2024-25, not {value!r}")
+    return value
+
+
+def _game_type(request, entity) -> str:
+    game_type = request.query_params.get("game_type", DEFAULT_GAME_TYPE)
+    known = list(get_store(entity).categories["game_type"])
+    if game_type not in known:
+        raise HTTPException(400, f"Unknown game_type {game_type!r}; choose from {known}")
+    return game_type
+
+
+def _query(request, entity) -> dict:
+    params = request.query_params
+    for required in ("name", "season"):
+        if not params.get(required):
+            raise HTTPException(400, f"Missing query parameter {required!r}")
+    return {"name": params["name"], "season": _season(params["season"]),
+            "game_type": _game_type(request, entity)}
+
+
+def _leaderboard_query(request, entity) -> dict:
+    args = _query(request, entity)
+    try:
+        top_n = int(request.query_params.get("top_n", 10))
+    except ValueError:
+        raise HTTPException(400, "top_n must be an integer")
+    if not 1 <= top_n <= MAX_TOP_N:
+        raise HTTPException(400, f"top_n must be between 1 and {MAX_TOP_N}")
+    metrics = request.query_params.getlist("metric") or list(entity.metrics)
+    unknown = [m for m in metrics if m not in entity.metrics]
+    if unknown:
+        raise HTTPException(400, f"Unknown metric(s) {unknown}; choose from {list(entity.metrics)}")
+    return {**args, "top_n": top_n, "metrics": list(dict.fromkeys(metrics))}
+
+
+def _compare_query(request, entity) -> dict:
+    names = list(dict.fromkeys(request.query_params.getlist("name")))
+    seasons = list(dict.fromkeys(request.query_params.getlist("season")))
+    if not names or not seasons:
+        raise HTTPException(400, "Give at least one 'name' and one 'season'")
+    if len(names) > MAX_COMPARE:
+        raise HTTPException(400, f"At most {MAX_COMPARE} names per request")
+    return {"names": names, "seasons": [_season(season) for season in seasons],
+            "game_type": _game_type(request, entity)}
+
+
+def _respond(request, build, parse) -> Response:
+    """
+    Runs on the thread pool: everything here may touch SQLite. A matching
+    If-None-Match is answered before any work; otherwise the encoded body
+    comes from the cache while the ETag still holds.
+    """
+    entity = ENTITIES.get(request.path_params["table"])
+    if entity is None:
+        raise HTTPException(404, f"Unknown table {request.path_params['table']!r}")
+    args = parse(request, entity)
+
+    tag = etag(entity)
+    headers = {"ETag": tag, "Cache-Control": "no-cache", "Vary": "Accept, Accept-Encoding"}
+    if tag in [t.strip().removeprefix("W/") for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    media_type = _media_type(request)
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())), media_type)
+    try:
+        body = _bodies.get_or_load(key, tag, lambda: _encode(build(entity, **args), media_type))
+    except ValueError as exc:
+        raise HTTPException(404, str(exc))
+    return Response(body, media_type=media_type, headers=headers)
+
+
+def endpoint(build, parse=_query):
+    async def handle(request):
+        return await run_in_threadpool(_respond, request, build, parse)
+    return handle
+
+
+async def http_error(request, exc):
+    return JSONResponse({"detail": exc.detail}, status_code=exc.status_code)
+
+
+app = Starlette(
+    routes=[
+        Route("/{table}/stats", endpoint(stats_body)),
+        Route("/{table}/deltas", endpoint(deltas_body)),
+        Route("/{table}/leaderboards", endpoint(leaderboards_body, _leaderboard_query)),
+        Route("/{table}/compare", endpoint(compare_body, _compare_query)),
+    ],
+    middleware=[Middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES)],
+    exception_handlers={HTTPException: http_error},
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the dashboard's numbers over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes; pair with NBA_STORE_SOURCE=dataplane to share the stores")
+    args = parser.parse_args()
+    uvicorn.run("service:app", host=args.host, port=args.port, workers=args.workers, log_level="warning")
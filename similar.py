@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+from derived import COUNTING_STATS
+from store import per_store, slice_moments
+
+TOP_K = 5
+# Candidates need this share of their slice's most games played, so a
+# two-game stint does not pass for anyone's twin.
+MIN_GP_SHARE = 0.25
+SIMILARITY_COL = "SIMILARITY"
+
+
+def profile_matrix(store, profile: list) -> np.ndarray:
+    """
+    One row per store row, one column per profile stat; counting stats are
+    turned into per-game values.
+    """
+    games = store.columns["GP"].astype(float)
+    columns = []
+    for col in profile:
+        values = store.columns[col].astype(float)
+        if col in COUNTING_STATS:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                values = values / games
+        columns.append(values)
+    return np.column_stack(columns)
+
+
+class SimilarityIndex:
+    """
+    Stat profiles standardized within each (season, game_type), so every era
+    is measured against its own league, and scaled to unit length. Cosine
+    similarity to any row is then a single matrix-vector product.
+    """
+
+    def __init__(self, store, id_col: str, profile: list):
+        self.store = store
+        self.ids = store.columns[id_col]
+        values = profile_matrix(store, profile)
+
+        slices = store.slices()
+        z = np.zeros_like(values)
+        eligible = np.zeros(len(values), dtype=bool)
+        if slices:
+            starts = np.array([start for _, (start, _) in slices])
+            sizes = np.diff(np.append(starts, len(values)))
+            mean, std = slice_moments(store, values)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                z = (values - np.repeat(mean, sizes, axis=0)) / np.repeat(std, sizes, axis=0)
+            games = store.columns["GP"].astype(float)
+            most_games = np.maximum.reduceat(np.nan_to_num(games), starts)
+            eligible = games >= MIN_GP_SHARE * np.repeat(most_games, sizes)
+
+        # Missing or constant stats count as league average.
+        z[~np.isfinite(z)] = 0.0
+        norms = np.linalg.norm(z, axis=1, keepdims=True)
+        self.unit = np.divide(z, norms, out=np.zeros_like(z), where=norms > 0).astype(np.float32)
+        self.eligible = eligible
+        self._game_types = {}
+
+    def _candidates(self, season: str, game_type: str, all_seasons: bool) -> tuple:
+        """
+        (rows, their unit profiles). A slice is a contiguous view; the
+        all-seasons set is gathered once per game type.
+        """
+        if not all_seasons:
+            rows = self.store.slice_range(season, game_type)
+            keep = self.eligible[rows]
+            return np.arange(rows.start, rows.stop)[keep], self.unit[rows][keep]
+        candidates = self._game_types.get(game_type)
+        if candidates is None:
+            code = list(self.store.categories["game_type"]).index(game_type)
+            rows = np.flatnonzero((self.store.codes["game_type"] == code) & self.eligible)
+            candidates = (rows, self.unit[rows])
+            self._game_types[game_type] = candidates
+        return candidates
+
+    def nearest(self, row: int, season: str, game_type: str, k: int = TOP_K,
+                all_seasons: bool = False) -> tuple:
+        """
+        (rows, similarities) of the `k` profiles closest to `row`, best first,
+        leaving out every season of the same id.
+        """
+        rows, unit = self._candidates(season, game_type, all_seasons)
+        sims = unit @ self.unit[row]
+        sims[self.ids[rows] == self.ids[row]] = -np.inf
+        k = min(k, int(np.isfinite(sims).sum()))
+        top = np.argpartition(-sims, k - 1)[:k] if k else np.array([], dtype=np.int64)
+        top = top[np.argsort(-sims[top], kind="stable")]
+        return rows[top], sims[top]
+
+
+def get_index(entity) -> SimilarityIndex:
+    return per_store(entity, "similar", lambda store: SimilarityIndex(store, entity.key[0], list(entity.profile)))
+
+
+def similar(entity, name: str, season: str, game_type: str, k: int = TOP_K,
+            all_seasons: bool = False) -> pd.DataFrame:
+    """
+    The `k` player-seasons (or team-seasons) whose stat profile is closest to
+    `name`'s in this slice: from the same season, or with `all_seasons` from
+    every season of the same game type.
+    """
+    index = get_index(entity)
+    row = index.store.row(name, season, game_type)
+    if row is None:
+        raise ValueError(f"No stats for {name} in season={season}, game_type={game_type}")
+
+    rows, sims = index.nearest(row, season, game_type, k, all_seasons)
+    columns = [entity.name_col, "season"] + list(entity.metrics)
+    out = pd.DataFrame({col: index.store.columns[col][rows] for col in columns})
+    out[SIMILARITY_COL] = sims.astype(float)
+    return out
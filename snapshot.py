@@ -0,0 +1,147 @@
+import json
+import os
+import shutil
+import sys
+from urllib.parse import quote
+
+import pandas as pd
+
+from db import connect
+from schema import KEY_COLUMNS, get_data_version, table_exists
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # optional: only needed for snapshots
+    pa = None
+
+SNAPSHOT_DIR = os.environ.get("NBA_SNAPSHOT_DIR", "snapshot")
+# Versions kept on disk; a replica still mapping the previous one can finish.
+KEEP_VERSIONS = 2
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def _table_dir(table: str, directory: str) -> str:
+    return os.path.join(directory, table)
+
+
+def _partition_path(root: str, season: str, game_type: str) -> str:
+    return os.path.join(root, f"season={quote(season)}", f"game_type={quote(game_type)}", "data.arrow")
+
+
+def swap_in(base: str, version: int):
+    """
+    Publishes the finished `<base>/v<version>.tmp` directory: renames it into
+    place, points `CURRENT` at it atomically and prunes all but the newest
+    KEEP_VERSIONS versions.
+    """
+    root = os.path.join(base, f"v{version}")
+    shutil.rmtree(root, ignore_errors=True)
+    os.rename(f"{root}.tmp", root)
+    pointer = os.path.join(base, "CURRENT")
+    with open(f"{pointer}.tmp", "w") as fh:
+        fh.write(f"v{version}")
+    os.replace(f"{pointer}.tmp", pointer)
+
+    versions = sorted(
+        (name for name in os.listdir(base) if name.startswith("v") and name[1:].isdigit()),
+        key=lambda name: int(name[1:])
+    )
+    for name in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(base, name), ignore_errors=True)
+
+
+def current_version(base: str):
+    """
+    The version `CURRENT` points at under `base`, or None before the first
+    publish.
+    """
+    try:
+        with open(os.path.join(base, "CURRENT")) as fh:
+            return int(fh.read().strip()[1:])
+    except (OSError, ValueError):
+        return None
+
+
+def write_snapshot(con, table: str, directory: str = SNAPSHOT_DIR) -> int:
+    """
+    Writes `table` as Arrow IPC files partitioned by season/game_type under
+    `<directory>/<table>/v<data_version>/`, then points `CURRENT` at it. The
+    pointer is replaced atomically, so readers never see a half-written version.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed; snapshots are unavailable")
+
+    version = get_data_version(con, table)
+    df = pd.read_sql(f'SELECT * FROM "{table}"', con)
+    # One schema for every partition, so a column that is all NULL in one
+    # slice does not change type there.
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+
+    base = _table_dir(table, directory)
+    root = os.path.join(base, f"v{version}")
+    tmp = f"{root}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    partitions = []
+    for (season, game_type), part in df.groupby(["season", "game_type"], sort=True):
+        path = _partition_path(tmp, season, game_type)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        batch = pa.Table.from_pandas(part.reset_index(drop=True), schema=schema, preserve_index=False)
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            writer.write_table(batch)
+        partitions.append({
+            "season": season,
+            "game_type": game_type,
+            "path": os.path.relpath(path, tmp),
+            "rows": len(part),
+        })
+
+    with open(os.path.join(tmp, "manifest.json"), "w") as fh:
+        json.dump({"table": table, "version": version, "rows": len(df), "partitions": partitions}, fh)
+
+    swap_in(base, version)
+    return len(df)
+
+
+def load_snapshot(table: str, directory: str = SNAPSHOT_DIR):
+    """
+    Returns (DataFrame, data_version) for the current snapshot of `table`, or
+    None when there is none. Partitions are memory-mapped, so reading them
+    costs no parse and no per-process read, but the frame itself is a private
+    copy: this shortens cold start, it does not share memory between
+    processes (the data plane does).
+    """
+    if pa is None:
+        return None
+    base = _table_dir(table, directory)
+    version = current_version(base)
+    if version is None:
+        return None
+    root = os.path.join(base, f"v{version}")
+    try:
+        with open(os.path.join(root, "manifest.json")) as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+    tables = []
+    for part in manifest["partitions"]:
+        source = pa.memory_map(os.path.join(root, part["path"]), "r")
+        tables.append(pa.ipc.open_file(source).read_all())
+    if not tables:
+        return None
+
+    df = pa.concat_tables(tables).to_pandas(split_blocks=True)
+    return df, manifest["version"]
+
+
+if __name__ == "__main__":
+    con = connect()
+    for table in sys.argv[1:] or list(KEY_COLUMNS):
+        if table_exists(con, table):
+            print(f"{table}: {write_snapshot(con, table)} rows -> {_table_dir(table, SNAPSHOT_DIR)}")
+    con.close()
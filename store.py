@@ -0,0 +1,328 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from cache import data_version, on_reset, read_sql
+from dataplane import attach, published_version
+from entities import ENTITIES
+from profiling import span
+from snapshot import load_snapshot
+
+# "snapshot" builds stores from the memory-mapped Arrow files ingest writes next
+# to nba.db, falling back to SQLite whenever they lag the database's version;
+# quicker to start, but each process still holds its own copy.
+# "dataplane" attaches to the arrays the `dataplane.py` loader publishes, so
+# every worker on the host shares one copy.
+STORE_SOURCE = os.environ.get("NBA_STORE_SOURCE", "sqlite")
+
+
+class ColumnStore:
+    """
+    A stats table held in memory as one NumPy array per column.
+
+    Rows are grouped by (season, game_type) so every slice is a contiguous
+    range, and sorted (slice, name) keys map a name to its row.
+    Subclasses pick the table and name column; `store_class` makes one per
+    entity descriptor.
+    """
+
+    TABLE = None
+    NAME_COL = None
+    CATEGORICAL = ["season", "game_type"]
+
+    def __init__(self, df: pd.DataFrame, version: int = 0):
+        self.version = version
+        self.shared = False
+
+        seasons = pd.Categorical(df["season"])
+        game_types = pd.Categorical(df["game_type"])
+        # lexsort is stable, so rows keep their table order inside each slice.
+        order = np.lexsort((game_types.codes, seasons.codes))
+        # Snapshots arrive already grouped; skip the reordering copy then.
+        if (np.diff(order) < 0).any():
+            df = df.iloc[order].reset_index(drop=True)
+
+        self.categories = {}
+        self.codes = {}
+        self.columns = {}
+        for col in df.columns:
+            if col in self.CATEGORICAL or col == self.NAME_COL:
+                cat = pd.Categorical(df[col])
+                self.categories[col] = cat.categories.to_numpy(dtype=object)
+                self.codes[col] = cat.codes
+                # Code -1 (missing) lands on the trailing None.
+                self.columns[col] = np.append(self.categories[col], None)[cat.codes]
+            else:
+                self.columns[col] = df[col].to_numpy()
+
+        name_codes = self.codes[self.NAME_COL]
+        keys = self._slice_ids() * len(self.categories[self.NAME_COL]) + name_codes
+        # Rows without a name get a key no lookup can produce.
+        keys = np.where(name_codes < 0, -1, keys)
+        # Stable, so a name appearing twice in a slice resolves to its first row.
+        self._key_rows = np.argsort(keys, kind="stable")
+        self._keys = keys[self._key_rows]
+        self._index()
+
+    def _slice_ids(self) -> np.ndarray:
+        return self.codes["season"].astype(np.int64) * len(self.categories["game_type"]) + self.codes["game_type"]
+
+    def _index(self):
+        # Per distinct value, not per row, so this stays small next to the arrays.
+        self._codes = {
+            col: {value: code for code, value in enumerate(self.categories[col])}
+            for col in ("season", "game_type", self.NAME_COL)
+        }
+        self._ranges = {}
+        self._names = {}
+        if not len(self):
+            return
+        slice_ids = self._slice_ids()
+        bounds = np.flatnonzero(np.diff(slice_ids)) + 1
+        starts = np.concatenate(([0], bounds))
+        stops = np.concatenate((bounds, [len(self)]))
+        for start, stop in zip(starts, stops):
+            slice_key = (
+                self.categories["season"][self.codes["season"][start]],
+                self.categories["game_type"][self.codes["game_type"][start]],
+            )
+            self._ranges[slice_key] = (int(start), int(stop))
+
+    def arrays(self) -> dict:
+        """
+        The store as plain arrays, every text column as codes into its
+        categories: what `dataplane.publish` writes out.
+        """
+        columns, codes, categories = {}, dict(self.codes), dict(self.categories)
+        for col, values in self.columns.items():
+            if col in codes:
+                continue
+            if values.dtype == object:
+                cat = pd.Categorical(values)
+                codes[col] = cat.codes
+                categories[col] = cat.categories.to_numpy(dtype=object)
+            else:
+                columns[col] = values
+        return {
+            "order": list(self.columns),
+            "columns": columns,
+            "codes": codes,
+            "categories": categories,
+            "keys": self._keys,
+            "key_rows": self._key_rows,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, version: int = 0, shared: bool = False):
+        """
+        Rebuilds a store from `arrays()` output without copying the numeric
+        columns or the lookup keys, e.g. from memory-mapped files. Only the
+        text columns are expanded per process.
+        """
+        store = cls.__new__(cls)
+        store.version = version
+        store.shared = shared
+        store.codes = {col: arrays["codes"][col] for col in cls.CATEGORICAL + [cls.NAME_COL]
+                       if col in arrays["codes"]}
+        store.categories = {col: arrays["categories"][col] for col in store.codes}
+        store.columns = {}
+        for col in arrays["order"]:
+            if col in arrays["columns"]:
+                store.columns[col] = arrays["columns"][col]
+            else:
+                store.columns[col] = np.append(arrays["categories"][col], None)[arrays["codes"][col]]
+        store._keys = arrays["keys"]
+        store._key_rows = arrays["key_rows"]
+        store._index()
+        return store
+
+    def __len__(self):
+        return len(self.columns[self.NAME_COL])
+
+    @classmethod
+    def from_db(cls, version: int = 0):
+        df = read_sql(f"SELECT * FROM {cls.TABLE}")
+        return cls(df, version)
+
+    @classmethod
+    def load(cls, version: int = 0):
+        if STORE_SOURCE == "dataplane":
+            store = attach(cls, version)
+            if store is not None:
+                return store
+        if STORE_SOURCE == "snapshot":
+            with span("snapshot", cls.TABLE) as record:
+                loaded = load_snapshot(cls.TABLE)
+                record["rows"] = len(loaded[0]) if loaded else 0
+            if loaded is not None and loaded[1] == version:
+                return cls(loaded[0], version)
+        return cls.from_db(version)
+
+    def row(self, name: str, season: str, game_type: str):
+        codes = [self._codes[col].get(value) for col, value in
+                 (("season", season), ("game_type", game_type), (self.NAME_COL, name))]
+        if not len(self) or None in codes:
+            return None
+        season_code, game_type_code, name_code = codes
+        slice_id = season_code * len(self.categories["game_type"]) + game_type_code
+        key = slice_id * len(self.categories[self.NAME_COL]) + name_code
+        i = int(np.searchsorted(self._keys, key))
+        if i < len(self._keys) and self._keys[i] == key:
+            return int(self._key_rows[i])
+        return None
+
+    def rows(self, names: list, seasons: list, game_type: str) -> np.ndarray:
+        """
+        The row of every (name, season) pair, name-major, -1 where there is
+        none: one searchsorted over the sorted keys for the whole batch.
+        """
+        name_codes = np.array([self._codes[self.NAME_COL].get(n, -1) for n in names], dtype=np.int64)
+        season_codes = np.array([self._codes["season"].get(s, -1) for s in seasons], dtype=np.int64)
+        game_type_code = self._codes["game_type"].get(game_type, -1)
+
+        slice_ids = season_codes * len(self.categories["game_type"]) + game_type_code
+        keys = (slice_ids[None, :] * len(self.categories[self.NAME_COL]) + name_codes[:, None]).ravel()
+        valid = ((name_codes[:, None] >= 0) & (season_codes[None, :] >= 0)).ravel() & (game_type_code >= 0)
+        if not len(self._keys):
+            return np.full(len(keys), -1)
+        i = np.searchsorted(self._keys, keys).clip(max=len(self._keys) - 1)
+        return np.where(valid & (self._keys[i] == keys), self._key_rows[i], -1)
+
+    def slices(self) -> list:
+        """
+        [((season, game_type), (start, stop))] in row order.
+        """
+        return list(self._ranges.items())
+
+    def slice_range(self, season: str, game_type: str) -> slice:
+        start, stop = self._ranges.get((season, game_type), (0, 0))
+        return slice(start, stop)
+
+    def names(self, season: str, game_type: str) -> list:
+        """
+        Sorted, distinct names for one slice (memoized per store version).
+        """
+        key = (season, game_type)
+        names = self._names.get(key)
+        if names is None:
+            names = sorted(set(self.columns[self.NAME_COL][self.slice_range(season, game_type)]))
+            self._names[key] = names
+        return names
+
+    def values(self, name: str, season: str, game_type: str, columns: list):
+        row = self.row(name, season, game_type)
+        if row is None:
+            return None
+        return tuple(self.columns[col][row] for col in columns)
+
+    def frame(self, season: str, game_type: str, columns: list = None) -> pd.DataFrame:
+        """
+        The slice as a DataFrame built from array views; nothing is copied.
+        """
+        rows = self.slice_range(season, game_type)
+        columns = columns or list(self.columns)
+        return pd.DataFrame({col: self.columns[col][rows] for col in columns}, copy=False)
+
+
+def slice_moments(store, values: np.ndarray) -> tuple:
+    """
+    (mean, std) of every column of `values` (one row per store row) within
+    each (season, game_type), skipping missing values: two (slices, columns)
+    arrays in `store.slices()` order, from one reduceat over the contiguous
+    slices.
+    """
+    starts = np.array([start for _, (start, _) in store.slices()], dtype=np.int64)
+    if not len(starts):
+        empty = np.empty((0, values.shape[1]))
+        return empty, empty
+    present = np.isfinite(values)
+    filled = np.where(present, values, 0.0)
+    counts = np.add.reduceat(present, starts, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.add.reduceat(filled, starts, axis=0) / counts
+        var = np.add.reduceat(filled * filled, starts, axis=0) / counts - mean * mean
+    return mean, np.sqrt(np.maximum(var, 0.0))
+
+
+def store_class(entity) -> type:
+    return type(f"{entity.noun.title()}Store", (ColumnStore,), {
+        "TABLE": entity.table,
+        "NAME_COL": entity.name_col,
+        "CATEGORICAL": ColumnStore.CATEGORICAL + list(entity.categorical),
+    })
+
+
+STORE_CLASSES = {table: store_class(entity) for table, entity in ENTITIES.items()}
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+on_reset(_stores.clear)
+
+
+def store_version(table: str) -> int:
+    """
+    The version a store should be at. In "dataplane" mode workers follow the
+    loader's version counter, so they swap when it publishes rather than when
+    the database changes.
+    """
+    if STORE_SOURCE == "dataplane":
+        version = published_version(table)
+        if version is not None:
+            return version
+    return data_version(table)
+
+
+def get_store(entity):
+    """
+    Returns the entity's shared store, reloading it once whenever the ingest
+    scripts bump the table's data version (or the data plane publishes a new
+    one).
+    """
+    store_cls = STORE_CLASSES[entity.table]
+    # Only the version decides: a store that fell back to SQLite because the
+    # published files could not be read is kept until the next version rather
+    # than reloaded on every call.
+    version = store_version(store_cls.TABLE)
+    store = _stores.get(store_cls)
+    if store is not None and store.version == version:
+        return store
+
+    # While one session rebuilds after a refresh, others keep serving the
+    # previous version instead of queueing behind the reload.
+    if not _stores_lock.acquire(blocking=store is None):
+        return store
+    try:
+        store = _stores.get(store_cls)
+        if store is None or store.version != version:
+            store = store_cls.load(version)
+            _stores[store_cls] = store
+    finally:
+        _stores_lock.release()
+    return store
+
+
+_built = {}
+_built_lock = threading.Lock()
+on_reset(_built.clear)
+
+
+def per_store(entity, kind: str, build):
+    """
+    `build(store)` over the entity's current store, run once per store
+    version and shared by every session. Holds the search and similarity
+    indexes and the league moments.
+    """
+    store = get_store(entity)
+    key = (kind, entity.table)
+    built = _built.get(key)
+    if built is not None and built[0] is store:
+        return built[1]
+    with _built_lock:
+        built = _built.get(key)
+        if built is None or built[0] is not store:
+            built = (store, build(store))
+            _built[key] = built
+    return built[1]
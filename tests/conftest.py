@@ -0,0 +1,23 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cache import reset_all  # noqa: E402
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """
+    A scratch directory holding a copy of the shipped `nba.db`, with every
+    process-level cache pointing at it.
+    """
+    shutil.copy(os.path.join(ROOT, "nba.db"), tmp_path / "nba.db")
+    monkeypatch.chdir(tmp_path)
+    reset_all()
+    yield tmp_path
+    reset_all()
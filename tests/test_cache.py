@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import cache
+from cache import ResultCache
+
+
+def frame(fill: float, rows: int = 100) -> pd.DataFrame:
+    return pd.DataFrame({"x": np.full(rows, fill)})
+
+
+class Loader:
+    """
+    A loader that counts its calls and returns `value`.
+    """
+
+    def __init__(self, value=None, delay: float = 0.0):
+        self.value = value if value is not None else frame(1.0)
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return self.value
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    A controllable `time.monotonic` for the in-memory TTL.
+    """
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_lru_evicts_least_recently_used_within_byte_budget():
+    size = cache._sizeof(frame(0.0))
+    rc = ResultCache(max_bytes=int(size * 2.5), ttl=60)
+    rc.get_or_load("a", 1, lambda: frame(1.0))
+    rc.get_or_load("b", 1, lambda: frame(2.0))
+    # Touching "a" makes "b" the oldest.
+    rc.get_or_load("a", 1, Loader())
+    rc.get_or_load("c", 1, lambda: frame(3.0))
+
+    assert list(rc._entries) == ["a", "c"]
+    assert rc._bytes == 2 * size <= rc.max_bytes
+    assert rc.stats["evictions"] == 1
+
+
+def test_values_larger_than_the_budget_are_not_kept():
+    rc = ResultCache(max_bytes=10, ttl=60)
+    loader = Loader()
+    rc.get_or_load("big", 1, loader)
+    rc.get_or_load("big", 1, loader)
+    assert loader.calls == 2 and rc._bytes == 0
+
+
+def test_memory_entries_expire_after_ttl(clock):
+    rc = ResultCache(ttl=60)
+    loader = Loader()
+    rc.get_or_load("k", 1, loader)
+    clock[0] += 59
+    rc.get_or_load("k", 1, loader)
+    assert loader.calls == 1
+
+    clock[0] += 2
+    rc.get_or_load("k", 1, loader)
+    assert loader.calls == 2
+
+
+def test_new_version_invalidates_the_entry():
+    rc = ResultCache(ttl=60)
+    old, new = Loader(frame(1.0)), Loader(frame(2.0))
+    rc.get_or_load("k", 1, old)
+    assert rc.get_or_load("k", 2, new).x.iloc[0] == 2.0
+    assert rc.get_or_load("k", 2, old).x.iloc[0] == 2.0
+    assert (old.calls, new.calls) == (1, 1)
+    assert len(rc._entries) == 1 and rc._bytes == cache._sizeof(frame(2.0))
+
+
+def test_disk_tier_is_shared_between_caches(tmp_path):
+    first, second = ResultCache(ttl=60, disk_dir=tmp_path), ResultCache(ttl=60, disk_dir=tmp_path)
+    first.get_or_load("k", 1, Loader(frame(5.0)))
+
+    loader = Loader()
+    assert second.get_or_load("k", 1, loader).x.iloc[0] == 5.0
+    assert loader.calls == 0 and second.stats["disk_hits"] == 1
+
+
+def test_disk_tier_prunes_expired_and_superseded_files(tmp_path):
+    writer = ResultCache(ttl=60, disk_dir=tmp_path)
+    writer.get_or_load("old", 1, Loader())
+    writer.get_or_load("stale", 1, Loader())
+    path = writer._disk_path("stale")
+    os.utime(path, (time.time() - 120, time.time() - 120))
+
+    reader = ResultCache(ttl=60, disk_dir=tmp_path)
+    loader = Loader()
+    reader._get_disk("old", 2)
+    reader._get_disk("stale", 1)
+    assert os.listdir(tmp_path) == []
+
+    reader.get_or_load("stale", 1, loader)
+    assert loader.calls == 1 and os.listdir(tmp_path) == [os.path.basename(path)]
+
+
+def test_concurrent_misses_load_once():
+    rc = ResultCache(ttl=60)
+    loader = Loader(delay=0.2)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(rc.get_or_load("k", 1, loader))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert loader.calls == 1
+    assert all(r is results[0] for r in results)
+    assert rc._key_locks == {}
+
+
+def test_failing_loads_do_not_leak_key_locks():
+    rc = ResultCache(ttl=60)
+
+    def fail():
+        raise ValueError("unknown name")
+
+    for i in range(100):
+        with pytest.raises(ValueError):
+            rc.get_or_load(("name", i), 1, fail)
+    assert rc._key_locks == {} and not rc._entries
@@ -0,0 +1,16 @@
+import numpy as np
+
+from career import entity_id, trajectory
+from entities import PLAYERS
+
+
+def test_deltas_and_rolling_window_follow_seasons_not_rows(workdir):
+    # LeBron James missed the 2021-22 playoffs.
+    history = trajectory(PLAYERS, entity_id(PLAYERS, "LeBron James", "2024-25", "Regular Season"))
+    playoffs = history[history.game_type == "Playoffs"].set_index("season")
+
+    assert list(playoffs.index) == ["2020-21", "2022-23", "2023-24", "2024-25"]
+    assert np.isnan(playoffs.loc["2022-23", "PPG_DELTA"])
+    assert np.isclose(playoffs.loc["2023-24", "PPG_DELTA"], playoffs.loc["2023-24", "PPG"] - playoffs.loc["2022-23", "PPG"])
+    # 2023-24's three-season window is 2021-22..2023-24, so 2020-21 is out.
+    assert np.isclose(playoffs.loc["2023-24", "PPG_ROLLING"], playoffs.loc[["2022-23", "2023-24"], "PPG"].mean())
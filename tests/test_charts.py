@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import charts
+from charts import AGGREGATE_THRESHOLD, WEBGL_THRESHOLD, hexbin, scatter_figure
+
+SELECTED = "Player 0"
+
+
+def scatter_frame(others: int, missing: bool = True, seed: int = 0) -> pd.DataFrame:
+    """
+    `others` players plus SELECTED, with a few missing values sprinkled in
+    unless `missing` is off.
+    """
+    rng = np.random.default_rng(seed)
+    n = others + 1
+    df = pd.DataFrame({
+        "PLAYER_NAME": [f"Player {i}" for i in range(n)],
+        "PTS": rng.gamma(2.0, 300.0, n),
+        "AST": rng.gamma(1.5, 80.0, n),
+    })
+    if missing:
+        df.loc[df.index[1::97], "AST"] = np.nan
+    return df
+
+
+def draw(df, mode="Auto"):
+    return scatter_figure(df, "PTS", "AST", "PLAYER_NAME", SELECTED, "Points", "Assists", "title", mode=mode)
+
+
+def finite_others(df) -> int:
+    return int((df.PTS.notna() & df.AST.notna() & (df.PLAYER_NAME != SELECTED)).sum())
+
+
+def test_hexbin_counts_every_point_once():
+    rng = np.random.default_rng(1)
+    x, y = rng.normal(size=5000), rng.normal(10, 3, size=5000)
+    cx, cy, counts = hexbin(x, y)
+
+    assert counts.sum() == len(x) and (counts > 0).all()
+    assert len(set(zip(cx, cy))) == len(counts)
+    # Centres stay within one cell of the data.
+    cell_x = np.ptp(x) / charts.HEX_GRIDSIZE
+    cell_y = np.ptp(y) / int(charts.HEX_GRIDSIZE / np.sqrt(3))
+    assert x.min() - cell_x <= cx.min() and cx.max() <= x.max() + cell_x
+    assert y.min() - cell_y <= cy.min() and cy.max() <= y.max() + cell_y
+
+
+def test_hexbin_of_identical_points_is_one_cell():
+    cx, cy, counts = hexbin(np.full(10, 3.0), np.full(10, -1.0))
+    assert counts.tolist() == [10] and cx.tolist() == [3.0] and cy.tolist() == [-1.0]
+
+
+@pytest.mark.parametrize("others, mode, trace_type", [
+    (WEBGL_THRESHOLD, "Auto", "scatter"),
+    (WEBGL_THRESHOLD + 1, "Auto", "scattergl"),
+    (AGGREGATE_THRESHOLD, "Auto", "scattergl"),
+    (AGGREGATE_THRESHOLD + 1, "Auto", "hexbin"),
+    (AGGREGATE_THRESHOLD + 1, "Points", "scattergl"),
+    (500, "Hexbin", "hexbin"),
+    (500, "Heatmap", "heatmap"),
+])
+def test_mode_thresholds(others, mode, trace_type):
+    # Rows with a missing axis do not count towards the thresholds.
+    ghosts = pd.DataFrame({"PLAYER_NAME": ["Ghost"] * 10, "PTS": np.nan, "AST": 1.0})
+    df = pd.concat([scatter_frame(others, missing=False), ghosts], ignore_index=True)
+    assert finite_others(df) == others
+
+    background = draw(df, mode).data[0]
+    if trace_type == "hexbin":
+        assert background.type == "scattergl" and background.marker.symbol == "hexagon"
+    else:
+        assert background.type == trace_type
+
+
+@pytest.mark.parametrize("mode", ["Points", "Hexbin", "Heatmap"])
+def test_binned_counts_cover_every_finite_point(mode):
+    df = scatter_frame(3000)
+    background = draw(df, mode).data[0]
+    if mode == "Points":
+        total = len(background.x)
+    elif mode == "Hexbin":
+        total = sum(background.customdata)
+    else:
+        total = np.nansum(np.array(background.z, dtype=float))
+    assert total == finite_others(df)
+
+
+@pytest.mark.parametrize("mode", ["Auto", "Points", "Hexbin", "Heatmap"])
+def test_selected_is_its_own_top_trace(mode):
+    df = scatter_frame(3000)
+    fig = draw(df, mode)
+
+    top = fig.data[-1]
+    assert top.marker.color == "red" and len(fig.data) == 2
+    assert list(top.x) == [df.PTS.iloc[0]] and list(top.y) == [df.AST.iloc[0]]
+    assert list(top.hovertext) == [SELECTED]
+    if mode == "Points":
+        assert SELECTED not in fig.data[0].hovertext
+
+
+def test_selected_without_both_axes_draws_no_point():
+    df = scatter_frame(100)
+    df.loc[0, "AST"] = np.nan
+    top = draw(df).data[-1]
+    assert len(top.x) == 0
+
+
+@pytest.mark.parametrize("mode", ["Auto", "Points", "Hexbin", "Heatmap"])
+def test_input_frame_is_not_modified(mode):
+    df = scatter_frame(3000).assign(season="2023-24")
+    before = df.copy()
+    draw(df, mode)
+    pd.testing.assert_frame_equal(df, before)
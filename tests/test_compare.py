@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from derived import PERCENTILE_SUFFIX
+from entities import PLAYERS, TEAMS
+from metrics import compare
+from store import get_store
+
+GAME_TYPE = "Regular Season"
+
+
+def league_percentiles(entity, season: str, metrics: list):
+    """
+    The reference: each metric's pandas rank within the slice, as the share of
+    the league at or below.
+    """
+    frame = get_store(entity).frame(season, GAME_TYPE, [entity.name_col] + metrics)
+    pctl = frame[metrics].astype(float).rank(pct=True, method="max")
+    pctl[entity.name_col] = frame[entity.name_col]
+    return pctl.drop_duplicates(subset=entity.name_col).set_index(entity.name_col)
+
+
+def test_rows_are_name_major_in_the_order_given(workdir):
+    names = ["Stephen Curry", "LeBron James", "Nobody Atall"]
+    seasons = ["2023-24", "2021-22"]
+    df = compare(PLAYERS, names, seasons, GAME_TYPE)
+
+    assert list(df.columns[:2]) == [PLAYERS.name_col, "season"]
+    assert list(zip(df[PLAYERS.name_col], df["season"])) == [(n, s) for n in names for s in seasons]
+    metrics = list(PLAYERS.metrics)
+    assert list(df.columns[2:]) == metrics + [m + PERCENTILE_SUFFIX for m in metrics]
+
+
+def test_missing_pairs_are_nan_rows(workdir):
+    # Wembanyama's first season was 2023-24.
+    df = compare(PLAYERS, ["Victor Wembanyama", "Nobody Atall", "LeBron James"], ["2022-23", "2023-24"], GAME_TYPE)
+    df = df.set_index([PLAYERS.name_col, "season"])
+
+    assert df.loc[("Victor Wembanyama", "2022-23")].isna().all()
+    assert df.loc[("Nobody Atall", "2022-23")].isna().all() and df.loc[("Nobody Atall", "2023-24")].isna().all()
+    assert df.loc[("Victor Wembanyama", "2023-24")].notna().all()
+    assert df.loc[("LeBron James", "2022-23")].notna().all()
+
+
+def test_unknown_season_or_game_type_is_all_nan(workdir):
+    assert compare(PLAYERS, ["LeBron James"], ["1999-00"], GAME_TYPE).iloc[:, 2:].isna().all().all()
+    assert compare(PLAYERS, ["LeBron James"], ["2023-24"], "Preseason").iloc[:, 2:].isna().all().all()
+
+
+@pytest.mark.parametrize("entity, names", [
+    (PLAYERS, ["LeBron James", "Nikola Jokić", "Stephen Curry", "Joe Johnson", "Victor Wembanyama"]),
+    (TEAMS, ["Boston Celtics", "Detroit Pistons", "Denver Nuggets"]),
+], ids=lambda x: getattr(x, "table", ""))
+def test_values_and_percentiles_match_pandas(workdir, entity, names):
+    seasons = ["2020-21", "2023-24", "2024-25"]
+    metrics = list(entity.metrics)
+    df = compare(entity, names, seasons, GAME_TYPE)
+    store = get_store(entity)
+
+    for season in seasons:
+        reference = league_percentiles(entity, season, metrics)
+        for name in names:
+            row = df[(df[entity.name_col] == name) & (df["season"] == season)].iloc[0]
+            values = store.values(name, season, GAME_TYPE, metrics)
+            if values is None:
+                assert row[metrics].isna().all()
+                continue
+            np.testing.assert_allclose(row[metrics].to_numpy(dtype=float), np.array(values, dtype=float))
+            np.testing.assert_allclose(
+                row[[m + PERCENTILE_SUFFIX for m in metrics]].to_numpy(dtype=float),
+                reference.loc[name, metrics].to_numpy(dtype=float),
+                err_msg=f"{name} {season}",
+            )
+
+
+def test_metric_subset(workdir):
+    df = compare(TEAMS, ["Boston Celtics"], ["2023-24"], GAME_TYPE, metrics=["W"])
+    assert list(df.columns) == [TEAMS.name_col, "season", "W", "W" + PERCENTILE_SUFFIX]
+    assert df["W_PCTL"].iloc[0] == 1.0
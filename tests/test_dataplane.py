@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+import pytest
+
+import cache
+import dataplane
+import store
+from db import connect
+from entities import PLAYERS
+from schema import bump_data_version
+from store import STORE_CLASSES, get_store
+
+SEASON, GAME_TYPE = "2023-24", "Regular Season"
+NAME = "LeBron James"
+PlayerStore = STORE_CLASSES["players"]
+
+
+@pytest.fixture
+def worker(workdir, monkeypatch):
+    """
+    This process as a dataplane worker, with the loader run in-process and
+    version stamps never trusted from memory.
+    """
+    monkeypatch.setattr(store, "STORE_SOURCE", "dataplane")
+    monkeypatch.setattr(cache, "VERSION_CHECK_SECONDS", 0.0)
+    con = connect()
+    bump_data_version(con, "players")
+    dataplane.serve([PlayerStore], once=True)
+    yield con
+    con.close()
+
+
+@pytest.fixture
+def db_loads(monkeypatch):
+    calls = []
+    from_db = PlayerStore.from_db.__func__
+
+    def counting(cls, version=0):
+        calls.append(version)
+        return from_db(cls, version)
+
+    monkeypatch.setattr(PlayerStore, "from_db", classmethod(counting))
+    return calls
+
+
+def test_attached_store_matches_sqlite(worker):
+    attached = get_store(PLAYERS)
+    private = PlayerStore.from_db(attached.version)
+
+    assert attached.shared and not private.shared
+    assert len(attached) == len(private)
+    for col in ("PTS", "GP", "PLAYER_ID"):
+        np.testing.assert_array_equal(attached.columns[col], private.columns[col])
+    assert attached.values(NAME, SEASON, GAME_TYPE, ["PTS", "PPG"]) == private.values(NAME, SEASON, GAME_TYPE,
+                                                                                      ["PTS", "PPG"])
+    assert get_store(PLAYERS) is attached
+
+
+def test_worker_swaps_when_the_loader_publishes(worker, db_loads):
+    before = get_store(PLAYERS)
+    pts = before.values(NAME, SEASON, GAME_TYPE, ["PTS"])[0]
+
+    with worker:
+        worker.execute("UPDATE players SET PTS = PTS + 100 WHERE PLAYER_NAME = ? AND season = ? AND game_type = ?",
+                       (NAME, SEASON, GAME_TYPE))
+    bump_data_version(worker, "players")
+    # Workers follow the published counter, not the database.
+    assert get_store(PLAYERS) is before
+
+    dataplane.serve([PlayerStore], once=True)
+    after = get_store(PLAYERS)
+    assert after.shared and after.version == before.version + 1
+    assert after.values(NAME, SEASON, GAME_TYPE, ["PTS"])[0] == pts + 100
+    # Only the loader read SQLite.
+    assert db_loads == [after.version]
+
+
+def test_unreadable_publish_falls_back_to_sqlite_once(worker, db_loads):
+    version = dataplane.published_version("players")
+    with open(os.path.join(dataplane.DATA_PLANE_DIR, "players", f"v{version}", "manifest.json"), "w") as fh:
+        fh.write("{not json")
+
+    stores = [get_store(PLAYERS) for _ in range(5)]
+    assert not stores[0].shared and stores[0].version == version
+    assert all(s is stores[0] for s in stores)
+    assert db_loads == [version]
@@ -0,0 +1,42 @@
+import sqlite3
+
+import pytest
+
+import cache
+import derived
+from explore import load_axes
+from schema import bump_data_version
+
+SEASON, GAME_TYPE = "2023-24", "Regular Season"
+NAME = "LeBron James"
+
+
+@pytest.fixture
+def fresh_versions(monkeypatch):
+    monkeypatch.setattr(cache, "VERSION_CHECK_SECONDS", 0.0)
+
+
+def lebron(df):
+    return df[df.PLAYER_NAME == NAME].iloc[0]
+
+
+def test_derived_axes_follow_the_derived_rebuild(workdir, fresh_versions):
+    con = sqlite3.connect("nba.db")
+    derived.materialize(con, "players")
+    before = lebron(load_axes("players", "PTS_PG", "PTS", SEASON, GAME_TYPE))
+
+    # An ingest bumps the base table first ...
+    with con:
+        con.execute("UPDATE players SET PTS = PTS * 1.3 WHERE PLAYER_NAME = ? AND season = ? AND game_type = ?",
+                    (NAME, SEASON, GAME_TYPE))
+    bump_data_version(con, "players")
+    # ... and a read in between sees the new base rows with the old derived ones.
+    between = lebron(load_axes("players", "PTS_PG", "PTS", SEASON, GAME_TYPE))
+    assert between.PTS_PG == pytest.approx(before.PTS_PG)
+
+    derived.materialize(con, "players", slices=[(SEASON, GAME_TYPE)])
+    con.close()
+
+    after = lebron(load_axes("players", "PTS_PG", "PTS", SEASON, GAME_TYPE))
+    assert after.PTS == pytest.approx(before.PTS * 1.3, abs=1)
+    assert after.PTS_PG > before.PTS_PG * 1.25
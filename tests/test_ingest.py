@@ -0,0 +1,121 @@
+import random
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import ingest
+from entities import PLAYERS
+from schema import get_data_version
+
+GOOD = ("2024-25", "Regular Season")
+BAD = ("2023-24", "Regular Season")
+
+
+class FlakyEndpoint:
+    """
+    Stands in for `LeagueDashPlayerStats`: serves the shipped slices with PTS
+    bumped (so an upsert has something to change), failing the first
+    `failures[(season, game_type)]` calls for a slice.
+    """
+
+    def __init__(self, failures: dict):
+        self.failures = dict(failures)
+        self.calls = {}
+        con = sqlite3.connect("nba.db")
+        self.source = pd.read_sql("SELECT * FROM players", con).drop(columns=list(PLAYERS.per_game))
+        con.close()
+
+    def __call__(self, season, season_type_all_star, timeout=None):
+        key = (season, season_type_all_star)
+        self.calls[key] = self.calls.get(key, 0) + 1
+        if self.calls[key] <= self.failures.get(key, 0):
+            raise ConnectionError(f"stub failure {self.calls[key]}")
+        df = self.source[(self.source.season == season) & (self.source.game_type == season_type_all_star)]
+        self._df = df.drop(columns=["season", "game_type"]).assign(PTS=df.PTS + 1).reset_index(drop=True)
+        return self
+
+    def get_data_frames(self):
+        return [self._df.copy()]
+
+
+@pytest.fixture
+def backoffs(monkeypatch):
+    """
+    Records each backoff attempt number and skips the wait.
+    """
+    attempts = []
+    monkeypatch.setattr(ingest, "backoff_delay", lambda attempt: attempts.append(attempt) or 0.0)
+    return attempts
+
+
+def fetch_kwargs(endpoint, max_attempts=3):
+    return {
+        "seasons": [GOOD[0], BAD[0]],
+        "game_types": ["Regular Season"],
+        "endpoints": {"players": endpoint},
+        "limiter": ingest.TokenBucket(rate=1e9, burst=1_000_000),
+        "max_attempts": max_attempts,
+    }
+
+
+def players_slice(season: str, game_type: str) -> pd.DataFrame:
+    con = sqlite3.connect("nba.db")
+    try:
+        return pd.read_sql(
+            "SELECT * FROM players WHERE season = ? AND game_type = ? ORDER BY PLAYER_ID",
+            con, params=(season, game_type)
+        )
+    finally:
+        con.close()
+
+
+def test_backoff_delay_is_capped_full_jitter():
+    random.seed(0)
+    for attempt in range(1, 10):
+        ceiling = min(ingest.BACKOFF_CAP, ingest.BACKOFF_BASE * 2 ** (attempt - 1))
+        assert all(0 <= ingest.backoff_delay(attempt) <= ceiling for _ in range(50))
+
+
+def test_fetch_all_retries_then_gives_up(workdir, backoffs):
+    endpoint = FlakyEndpoint({GOOD: 2, BAD: 99})
+    results = ingest.fetch_all(["players"], **fetch_kwargs(endpoint))
+    by_slice = {(r.season, r.game_type): r for r in results}
+
+    assert by_slice[GOOD].ok and by_slice[GOOD].attempts == 3
+    assert len(by_slice[GOOD].errors) == 2
+    assert not by_slice[BAD].ok and by_slice[BAD].attempts == 3
+    assert by_slice[BAD].errors[-1] == "ConnectionError: stub failure 3"
+    assert endpoint.calls == {GOOD: 3, BAD: 3}
+    # One backoff after each failed attempt but the last.
+    assert sorted(backoffs) == [1, 1, 2, 2]
+
+
+def test_upsert_ingest_reports_and_skips_failed_slices(workdir, backoffs):
+    good, bad = players_slice(*GOOD), players_slice(*BAD)
+    failed = ingest.run_ingest(["players"], **fetch_kwargs(FlakyEndpoint({BAD: 99}), max_attempts=2))
+
+    assert [(r.season, r.game_type) for r in failed] == [BAD]
+    pd.testing.assert_frame_equal(players_slice(*BAD), bad)
+    assert players_slice(*GOOD).PTS.tolist() == (good.PTS + 1).tolist()
+
+    con = sqlite3.connect("nba.db")
+    logged = set(con.execute("SELECT season, game_type FROM ingest_slices WHERE table_name = 'players'"))
+    con.close()
+    assert logged == {GOOD}
+
+
+def test_full_ingest_does_not_swap_when_a_slice_fails(workdir, backoffs):
+    con = sqlite3.connect("nba.db")
+    version = get_data_version(con, "players")
+    con.close()
+    before = players_slice(*GOOD)
+
+    failed = ingest.run_ingest(["players"], full=True, **fetch_kwargs(FlakyEndpoint({BAD: 99}), max_attempts=2))
+
+    assert [(r.season, r.game_type) for r in failed] == [BAD]
+    pd.testing.assert_frame_equal(players_slice(*GOOD), before)
+    con = sqlite3.connect("nba.db")
+    assert get_data_version(con, "players") == version
+    assert not con.execute("SELECT name FROM sqlite_master WHERE name LIKE 'players!_!_v%' ESCAPE '!'").fetchall()
+    con.close()
@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+
+import ranks
+from db import connect
+from entities import PLAYERS, TEAMS
+from leaderboard import build_leaderboards, load_ranked_boards, load_slice
+
+SEASON, GAME_TYPE = "2024-25", "Regular Season"
+TOP_N = 10
+
+
+@pytest.mark.parametrize("entity", [PLAYERS, TEAMS], ids=lambda e: e.table)
+def test_rank_table_boards_match_in_memory(workdir, entity):
+    con = connect()
+    ranks.materialize(con, entity.table)
+    con.close()
+
+    metrics = list(entity.metrics)
+    slice_df = load_slice(entity.table, entity.name_col, metrics, SEASON, GAME_TYPE)
+    # Everyone on some top-N board (where the two UNION arms overlap) plus a
+    # spread of everyone else.
+    leaders = {n for m in metrics for n in slice_df.nlargest(TOP_N, m)[entity.name_col]}
+    names = sorted(leaders | set(slice_df[entity.name_col].iloc[::100]))
+
+    for name in names:
+        expected = build_leaderboards(slice_df, entity.name_col, metrics, name, TOP_N)
+        actual = load_ranked_boards(entity.table, entity.name_col, metrics, SEASON, GAME_TYPE, name, TOP_N)
+        for metric in metrics:
+            cols = [entity.name_col, metric, "rank", "active"]
+            pd.testing.assert_frame_equal(
+                actual[metric][cols], expected[metric][cols], check_dtype=False, obj=f"{name} {metric}"
+            )
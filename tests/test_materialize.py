@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+import derived
+import ranks
+from db import connect
+
+SLICE = ("2024-25", "Playoffs")
+
+
+@pytest.mark.parametrize("table", ["players", "teams"])
+def test_slice_rebuild_matches_full_rebuild(workdir, table):
+    con = connect()
+    derived.materialize(con, table)
+    ranks.materialize(con, table)
+
+    # An ingest that changed one slice: new values and a vanished row.
+    with con:
+        con.execute(f"UPDATE {table} SET PTS = PTS + 10, GP = GP + 1 WHERE season = ? AND game_type = ?", SLICE)
+        con.execute(f"DELETE FROM {table} WHERE rowid = (SELECT MIN(rowid) FROM {table} "
+                    "WHERE season = ? AND game_type = ?)", SLICE)
+    full = connect(path=str(workdir / "full.db"))
+    con.backup(full)
+
+    assert derived.materialize(con, table, [SLICE]) < derived.materialize(full, table)
+    assert ranks.materialize(con, table, [SLICE]) < ranks.materialize(full, table)
+
+    for target in (derived.derived_table(table), ranks.ranks_table(table)):
+        actual = pd.read_sql(f'SELECT * FROM "{target}"', con)
+        expected = pd.read_sql(f'SELECT * FROM "{target}"', full)
+        key = list(expected.columns)
+        pd.testing.assert_frame_equal(
+            actual[key].sort_values(key).reset_index(drop=True),
+            expected.sort_values(key).reset_index(drop=True),
+        )
+
+
+def test_new_registry_metric_reaches_every_slice(workdir, monkeypatch):
+    con = connect()
+    derived.materialize(con, "players")
+    ranks.materialize(con, "players")
+
+    monkeypatch.setitem(derived.REGISTRY, "PF_PER36", ("PF per 36 min", derived.per_36("PF"), ("players",)))
+    derived.materialize(con, "players", [SLICE])
+    ranks.materialize(con, "players", [SLICE])
+
+    info = pd.read_sql('PRAGMA table_info("players_derived")', con).set_index("name")["type"]
+    assert info["PF_PER36"] == "REAL" and info["PF_PER36_PCTL"] == "REAL"
+    per_slice = pd.read_sql(
+        "SELECT season, game_type, COUNT(PF_PER36) AS n FROM players_derived GROUP BY season, game_type", con
+    )
+    assert len(per_slice) == 10 and (per_slice.n > 0).all()
+    ranked = pd.read_sql(
+        "SELECT DISTINCT season, game_type FROM players_ranks WHERE metric = 'PF_PER36'", con
+    )
+    assert len(ranked) == 10
@@ -0,0 +1,79 @@
+import pandas as pd
+import pytest
+
+from entities import PLAYERS
+from search import SearchIndex, fold, search_names
+from store import STORE_CLASSES, get_store
+
+
+@pytest.fixture
+def toy_store():
+    """
+    Four players: two with nicknames, one who changed his name between
+    seasons, and one who only played the first season.
+    """
+    return STORE_CLASSES["players"](pd.DataFrame({
+        "PLAYER_ID":   [1, 2, 3, 4, 1, 2, 4],
+        "PLAYER_NAME": ["Moritz Wagner", "Enes Kanter", "Franz Wagner", "Stephen Curry",
+                        "Moritz Wagner", "Enes Freedom", "Stephen Curry"],
+        "NICKNAME":    ["Moe", "Enes", "Franz", "Chef", "Moe", "Enes", "Chef"],
+        "season":      ["2020-21"] * 4 + ["2021-22"] * 3,
+        "game_type":   ["Regular Season"] * 7,
+        "TEAM_ABBREVIATION": ["ORL", "POR", "ORL", "GSW", "ORL", "BOS", "GSW"],
+        "GP":          [50, 72, 60, 63, 70, 35, 64],
+    }))
+
+
+@pytest.fixture
+def toy_index(toy_store):
+    return SearchIndex(toy_store, "PLAYER_ID", "NICKNAME")
+
+
+def test_fold():
+    assert fold("  Nikola  Jokić ") == "nikola jokic"
+    assert fold("D'Angelo Russell") == "d angelo russell"
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("lebr", "LeBron James"),            # prefix
+    ("lebrom jams", "LeBron James"),     # typos
+    ("jokic", "Nikola Jokić"),           # accents
+    ("JOKIĆ", "Nikola Jokić"),
+    ("steph", "Stephen Curry"),          # half a first name
+    ("steph curry", "Stephen Curry"),
+])
+def test_best_match_comes_first(workdir, query, expected):
+    assert search_names(PLAYERS, query)[0] == expected
+
+
+def test_nonsense_finds_nothing(workdir):
+    assert search_names(PLAYERS, "xqzv") == []
+
+
+def test_k_limits_and_orders_results(workdir):
+    results = search_names(PLAYERS, "james", k=5)
+    assert len(results) == 5 and len(set(results)) == 5
+    assert search_names(PLAYERS, "james", k=3) == results[:3]
+
+
+def test_slice_filter_keeps_only_that_slices_names(workdir):
+    # Stephen Curry's Warriors missed the 2023-24 playoffs.
+    season, game_type = "2023-24", "Playoffs"
+    results = search_names(PLAYERS, "steph", season, game_type)
+    assert "Stephen Curry" not in results
+    assert set(results) <= set(get_store(PLAYERS).names(season, game_type))
+    assert search_names(PLAYERS, "steph", season, "Regular Season")[0] == "Stephen Curry"
+
+
+def test_nickname_finds_the_player(toy_store, toy_index):
+    assert toy_index.search("chef") == ["Stephen Curry"]
+    assert toy_index.search("chef curry")[0] == "Stephen Curry"
+    assert SearchIndex(toy_store, "PLAYER_ID").search("chef") == []
+    assert toy_index.search("moe wagner")[0] == "Moritz Wagner"
+    assert set(toy_index.search("wagner", k=2)) == {"Franz Wagner", "Moritz Wagner"}
+
+
+def test_renamed_player_is_one_entry_under_the_slice_name(toy_index):
+    assert toy_index.search("kanter") == ["Enes Freedom"]
+    assert toy_index.search("kanter", "2020-21", "Regular Season") == ["Enes Kanter"]
+    assert "Franz Wagner" not in toy_index.search("franz", "2021-22", "Regular Season")
@@ -0,0 +1,95 @@
+import pytest
+from starlette.testclient import TestClient
+
+import service
+
+LEBRON = {"name": "LeBron James", "season": "2023-24"}
+
+
+@pytest.fixture
+def client(workdir):
+    with TestClient(service.app) as client:
+        yield client
+
+
+def test_stats(client):
+    response = client.get("/players/stats", params=LEBRON)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == service.JSON_TYPE
+    body = response.json()
+    assert body["game_type"] == service.DEFAULT_GAME_TYPE
+    assert body["stats"]["PPG"] == pytest.approx(25.7)
+    assert list(body["stats"]) == list(service.ENTITIES["players"].metrics)
+
+
+def test_matching_etag_is_not_modified(client):
+    first = client.get("/teams/stats", params={"name": "Boston Celtics", "season": "2023-24"})
+    tag = first.headers["etag"]
+
+    again = client.get("/teams/stats", params={"name": "Boston Celtics", "season": "2023-24"},
+                       headers={"If-None-Match": f'W/"other", {tag}'})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["etag"] == tag
+
+    stale = client.get("/teams/stats", params={"name": "Boston Celtics", "season": "2023-24"},
+                       headers={"If-None-Match": '"players-0-0"'})
+    assert stale.status_code == 200
+
+
+@pytest.mark.parametrize("path, params", [
+    ("/players/stats", {"name": "LeBron James"}),
+    ("/players/stats", {**LEBRON, "season": "2023-25"}),
+    ("/players/stats", {**LEBRON, "season": "2023"}),
+    ("/players/deltas", {**LEBRON, "game_type": "Preseason"}),
+    ("/players/leaderboards", {**LEBRON, "top_n": "ten"}),
+    ("/players/leaderboards", {**LEBRON, "top_n": "0"}),
+    ("/players/leaderboards", {**LEBRON, "top_n": str(service.MAX_TOP_N + 1)}),
+    ("/players/leaderboards", {**LEBRON, "metric": "PTS"}),
+    ("/players/compare", {"season": "2023-24"}),
+])
+def test_bad_parameters_are_400(client, path, params):
+    response = client.get(path, params=params)
+    assert response.status_code == 400
+    assert response.json()["detail"]
+
+
+@pytest.mark.parametrize("path, params", [
+    ("/players/stats", {**LEBRON, "name": "Nobody Atall"}),
+    ("/players/deltas", {**LEBRON, "name": "Nobody Atall"}),
+    ("/players/leaderboards", {**LEBRON, "name": "Nobody Atall"}),
+    ("/coaches/stats", LEBRON),
+])
+def test_unknown_names_and_tables_are_404(client, path, params):
+    response = client.get(path, params=params)
+    assert response.status_code == 404
+    assert response.json()["detail"]
+    assert service._bodies._key_locks == {}
+
+
+def test_leaderboards_are_gzipped_when_accepted(client):
+    params = {**LEBRON, "top_n": 25}
+    plain = client.get("/players/leaderboards", params=params, headers={"Accept-Encoding": "identity"})
+    zipped = client.get("/players/leaderboards", params=params, headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in plain.headers
+    assert len(plain.content) > service.GZIP_MIN_BYTES
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert zipped.json() == plain.json()
+    board = plain.json()["leaderboards"]["PPG"]
+    assert [row["rank"] for row in board] == sorted(row["rank"] for row in board)
+    assert [row["name"] for row in board if row["selected"]] == ["LeBron James"]
+
+
+def test_msgpack_when_accepted(client):
+    msgpack = pytest.importorskip("msgpack")
+    params = {"name": ["LeBron James", "Stephen Curry"], "season": ["2022-23", "2023-24"]}
+    as_json = client.get("/players/compare", params=params)
+    packed = client.get("/players/compare", params=params, headers={"Accept": "application/msgpack"})
+
+    assert packed.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(packed.content) == as_json.json()
+    rows = as_json.json()["rows"]
+    assert [(r["name"], r["season"]) for r in rows] == [
+        ("LeBron James", "2022-23"), ("LeBron James", "2023-24"),
+        ("Stephen Curry", "2022-23"), ("Stephen Curry", "2023-24"),
+    ]
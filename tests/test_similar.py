@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from entities import PLAYERS
+from similar import MIN_GP_SHARE, get_index, similar
+from store import get_store, slice_moments
+
+SEASON, GAME_TYPE = "2023-24", "Regular Season"
+NAME = "LeBron James"
+
+
+def test_slice_moments_match_pandas(workdir):
+    store = get_store(PLAYERS)
+    metrics = ["PPG", "FG3_PCT", "PLUS_MINUS"]
+    mean, std = slice_moments(store, np.column_stack([store.columns[m].astype(float) for m in metrics]))
+
+    frame = pd.DataFrame({col: store.columns[col] for col in ["season", "game_type"] + metrics})
+    grouped = frame.groupby(["season", "game_type"], sort=False)[metrics]
+    assert [key for key, _ in store.slices()] == list(grouped.groups)
+    np.testing.assert_allclose(mean, grouped.mean().to_numpy())
+    np.testing.assert_allclose(std, grouped.std(ddof=0).to_numpy(), atol=1e-9)
+
+
+def test_only_regulars_are_candidates(workdir):
+    index = get_index(PLAYERS)
+    store = index.store
+    for season, game_type in [(SEASON, GAME_TYPE), ("2020-21", "Playoffs")]:
+        rows = store.slice_range(season, game_type)
+        games = store.columns["GP"][rows].astype(float)
+        np.testing.assert_array_equal(index.eligible[rows], games >= MIN_GP_SHARE * games.max())
+
+    candidates, _ = index._candidates(SEASON, GAME_TYPE, all_seasons=False)
+    assert index.eligible[candidates].all()
+    assert 0 < len(candidates) < len(store.frame(SEASON, GAME_TYPE, ["GP"]))
+
+
+def test_nearest_is_best_first_and_never_the_same_id(workdir):
+    index = get_index(PLAYERS)
+    row = index.store.row(NAME, SEASON, GAME_TYPE)
+    rows, sims = index.nearest(row, SEASON, GAME_TYPE, k=10)
+
+    assert len(rows) == 10 and (np.diff(sims) <= 0).all()
+    assert (index.ids[rows] != index.ids[row]).all()
+    # The same ranking as scoring every eligible row in the slice.
+    candidates, unit = index._candidates(SEASON, GAME_TYPE, all_seasons=False)
+    sims_all = unit @ index.unit[row]
+    sims_all[index.ids[candidates] == index.ids[row]] = -np.inf
+    np.testing.assert_allclose(sims, np.sort(sims_all)[::-1][:10], rtol=1e-6)
+
+
+def test_all_seasons_draws_from_every_season_of_the_game_type(workdir):
+    out = similar(PLAYERS, NAME, SEASON, GAME_TYPE, k=25, all_seasons=True)
+    store = get_store(PLAYERS)
+
+    assert NAME not in set(out[PLAYERS.name_col])
+    assert out["season"].nunique() > 1
+    for name, season in zip(out[PLAYERS.name_col], out["season"]):
+        assert store.row(name, season, GAME_TYPE) is not None
+
+    index = get_index(PLAYERS)
+    rows, _ = index._candidates(SEASON, GAME_TYPE, all_seasons=True)
+    seasons = {store.columns["season"][r] for r in rows}
+    assert seasons == {key[0] for key, _ in store.slices() if key[1] == GAME_TYPE}
+    assert {store.columns["game_type"][r] for r in rows} == {GAME_TYPE}
+
+
+def test_unknown_name_raises(workdir):
+    with pytest.raises(ValueError):
+        similar(PLAYERS, "Nobody Atall", SEASON, GAME_TYPE)